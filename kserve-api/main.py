@@ -1,32 +1,139 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Dict, Optional
-from kubernetes import client, config
-from kubernetes.client.rest import ApiException
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from kubernetes_asyncio import client, config, watch
+from kubernetes_asyncio.client import api_client as k8s_api_client, rest as k8s_rest
+from kubernetes_asyncio.client.rest import ApiException
+from kubernetes_asyncio.watch import watch as k8s_watch
+from cachetools import TTLCache
+from aiolimiter import AsyncLimiter
+import aiohttp
+import asyncio
+import codecs
+import functools
+import hashlib
+import httpx
 import logging
+import orjson
 import os
-import requests
-import time
+import types
+
+# The Kubernetes client encodes request bodies and decodes responses and watch events
+# with the stdlib json module; point those modules at orjson instead (it only calls
+# dumps/loads, and orjson's decode error is a ValueError like json's)
+K8S_JSON_CODEC = types.SimpleNamespace(dumps=orjson.dumps, loads=orjson.loads)
+for _module in (k8s_rest, k8s_api_client, k8s_watch):
+    _module.json = K8S_JSON_CODEC
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="CalvinCode Deployment API")
+# Kubernetes API clients, created on startup (the aiohttp session needs a running event loop)
+api_client = None
+custom_api = None
+core_v1 = None
+# Shared HTTP client for warm-up requests, so TLS connections are kept alive
+http_client = None
+# Cloudflare API client; HTTP/2 multiplexes concurrent calls over one TLS connection
+cloudflare_client = None
+
+
+async def prewarm_connections():
+    """Open the apiserver and Cloudflare connections before the first request needs them"""
+    warmups = {"Kubernetes apiserver": client.VersionApi(api_client).get_code(_request_timeout=PREWARM_TIMEOUT_SECONDS)}
+    if CLOUDFLARE_API_TOKEN:
+        warmups["Cloudflare API"] = cloudflare_client.get("/user/tokens/verify", timeout=PREWARM_TIMEOUT_SECONDS)
+
+    results = await asyncio.gather(*warmups.values(), return_exceptions=True)
+    for target, result in zip(warmups, results):
+        if isinstance(result, Exception):
+            logger.warning("Connection pre-warm failed for %s: %s", target, result)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global api_client, custom_api, core_v1, http_client, cloudflare_client
+
+    # Load Kubernetes config (in-cluster or local)
+    try:
+        config.load_incluster_config()
+        logger.info("Loaded in-cluster Kubernetes config")
+    except config.ConfigException:
+        await config.load_kube_config()
+        logger.info("Loaded local Kubernetes config")
+
+    # Create Kubernetes API client, shared by all requests so apiserver
+    # connections stay in the keep-alive pool between calls
+    configuration = client.Configuration.get_default_copy()
+    configuration.connection_pool_maxsize = K8S_POOL_MAXSIZE
+    api_client = client.ApiClient(configuration=configuration)
+    custom_api = client.CustomObjectsApi(api_client)
+    core_v1 = client.CoreV1Api(api_client)
+
+    http_client = httpx.AsyncClient(
+        timeout=15,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+    )
+    cloudflare_client = httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=CLOUDFLARE_RETRIES,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40)
+        ),
+        base_url=CLOUDFLARE_API_BASE,
+        headers={
+            "Authorization": f"Bearer {CLOUDFLARE_API_TOKEN}",
+            # Request bodies are pre-encoded with orjson and sent as content=
+            "Content-Type": "application/json"
+        },
+        timeout=30
+    )
+
+    # Pay the TLS handshakes now rather than on the first deploy
+    await prewarm_connections()
+
+    # Mirror Knative Services and their pods in memory so /apps and /logs
+    # don't LIST on every call, and batch Cloudflare purges across deploys
+    worker_tasks = [
+        asyncio.create_task(knative_service_cache.run()),
+        asyncio.create_task(knative_pod_cache.run()),
+        asyncio.create_task(purge_batcher.run())
+    ]
+
+    yield
+
+    # Give in-flight post-deploy work (purges, warm-ups) a chance to finish while
+    # the purge batcher and the HTTP clients are still up, then cancel the rest
+    await drain_background_tasks(SHUTDOWN_DRAIN_SECONDS)
+
+    for task in worker_tasks:
+        task.cancel()
+    await asyncio.gather(*worker_tasks, return_exceptions=True)
+    await http_client.aclose()
+    await cloudflare_client.aclose()
+    await api_client.close()
+
+
+class LogAwareGZipMiddleware(GZipMiddleware):
+    """GZip middleware that leaves Server-Sent Event log streams alone (gzip would hold events back)"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
 
-# Load Kubernetes config (in-cluster or local)
-try:
-    config.load_incluster_config()
-    logger.info("Loaded in-cluster Kubernetes config")
-except:
-    config.load_kube_config()
-    logger.info("Loaded local Kubernetes config")
 
-# Create Kubernetes API client
-api_client = client.ApiClient()
-custom_api = client.CustomObjectsApi(api_client)
-core_v1 = client.CoreV1Api(api_client)
+app = FastAPI(title="CalvinCode Deployment API", lifespan=lifespan, default_response_class=ORJSONResponse)
+# Compress sizeable responses (/apps listings, /logs tails)
+app.add_middleware(LogAwareGZipMiddleware, minimum_size=1024, compresslevel=5)
 
 # Constants
 KNATIVE_GROUP = "serving.knative.dev"
@@ -36,17 +143,111 @@ DOMAIN_MAPPING_PLURAL = "domainmappings"
 DOMAIN_MAPPING_VERSION = "v1beta1"
 DEFAULT_NAMESPACE = os.getenv("DEFAULT_NAMESPACE", "default")
 DOMAIN = os.getenv("DOMAIN", "calvinruntime.net")
+DOMAIN_SUFFIX = "." + DOMAIN
+
+# Server-side apply identity for the objects this API owns
+FIELD_MANAGER = "calvincode"
+APPLY_PATCH_CONTENT_TYPE = "application/apply-patch+yaml"
+JSON_PATCH_CONTENT_TYPE = "application/json-patch+json"
+# Field manager of Services written by create/merge-patch before deploys moved to
+# server-side apply (the Kubernetes client's default, taken from its User-Agent)
+LEGACY_FIELD_MANAGER = "OpenAPI-Generator"
+
+# Platform services hidden from /apps
+INFRA_SERVICES = frozenset({"kserve-api", "scheduler-api"})
+# Knative creates pods with labels: serving.knative.dev/service={name}
+POD_SERVICE_LABEL = "serving.knative.dev/service"
+POD_LABEL_SELECTOR_PREFIX = POD_SERVICE_LABEL + "="
+K8S_POOL_MAXSIZE = int(os.getenv("K8S_POOL_MAXSIZE", "100"))
+# Client-side ceiling on apiserver writes per second, so deploy bursts queue here
+# instead of being throttled (429) by the apiserver's priority and fairness
+K8S_WRITE_QPS = float(os.getenv("K8S_WRITE_QPS", "20"))
+K8S_THROTTLE_RETRIES = 3
+PREWARM_TIMEOUT_SECONDS = 5
+K8S_MAX_RETRY_AFTER_SECONDS = 10
+_apiserver_write_limiter = AsyncLimiter(K8S_WRITE_QPS, 1)
+# Cap on concurrent apiserver requests from this process (reads and writes; long-lived
+# watches are excluded), so bursts are queued here rather than fanned out to etcd
+K8S_MAX_INFLIGHT = int(os.getenv("K8S_MAX_INFLIGHT", "16"))
+_apiserver_semaphore = asyncio.Semaphore(K8S_MAX_INFLIGHT)
+
+# A followed log stays open for as long as the client listens, so only opening it is bounded;
+# one-off tails keep the client's default total timeout
+FOLLOW_LOG_REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=None)
 
 # Cloudflare cache invalidation and analytics
 CLOUDFLARE_ZONE_ID = os.getenv("CLOUDFLARE_ZONE_ID")
 CLOUDFLARE_API_TOKEN = os.getenv("CLOUDFLARE_API_TOKEN")
+CLOUDFLARE_API_BASE = "https://api.cloudflare.com/client/v4"
 CLOUDFLARE_ACCOUNT_ID = os.getenv("CLOUDFLARE_ACCOUNT_ID", "920b1a6e159cf77dab28969103a4765b")
+# Purges from deploys landing within one window share a single API call;
+# Cloudflare accepts up to 100 hosts per purge request
+PURGE_BATCH_MAX_HOSTS = 100
+PURGE_BATCH_WINDOW_SECONDS = float(os.getenv("PURGE_BATCH_WINDOW_SECONDS", "1"))
+# Backoff between warm-up attempts answered from the edge cache; together they
+# bound the wait for a purge to propagate to the 3s previously slept unconditionally
+WARMUP_RETRY_DELAYS = (0.2, 0.4, 0.8, 1.6)
+# Analytics queries are read-only, so throttled (429) and gateway-error answers are
+# retried with exponential backoff, honoring Retry-After; connect errors are retried
+# by the transport
+CLOUDFLARE_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+CLOUDFLARE_RETRIES = 3
+CLOUDFLARE_RETRY_BACKOFF_SECONDS = 0.2
+CLOUDFLARE_MAX_RETRY_AFTER_SECONDS = 10
+# Analytics are bucketed by hour, so a response stays accurate for a while.
+# Keyed by (endpoint, host filter, hours); a purge drops entries for its hosts.
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "60"))
+_analytics_cache = TTLCache(maxsize=256, ttl=ANALYTICS_CACHE_TTL)
+
+# Short-lived cache for Knative Service / DomainMapping existence checks, keyed by
+# (plural, namespace, name). A 404 is cached as None.
+EXISTENCE_CACHE_TTL = float(os.getenv("EXISTENCE_CACHE_TTL", "5"))
+_existence_cache = TTLCache(maxsize=1024, ttl=EXISTENCE_CACHE_TTL)
+_existence_inflight = {}  # key -> in-flight GET task shared by concurrent callers
+_CACHE_MISS = object()
+_list_inflight = {}  # namespace -> in-flight live LIST task shared by concurrent /apps callers
+
+# DomainMappings this process has applied recently, (namespace, domain) -> service name,
+# so redeploying with the same custom domain doesn't re-apply an identical mapping
+DOMAIN_MAPPING_CACHE_TTL = float(os.getenv("DOMAIN_MAPPING_CACHE_TTL", "300"))
+_applied_domain_mappings = TTLCache(maxsize=1024, ttl=DOMAIN_MAPPING_CACHE_TTL)
+
+# Server-side timeout for each watch request; the watch is simply re-opened when it expires
+WATCH_TIMEOUT_SECONDS = 300
+# Client-side timeout for a watch: no total limit, so the server ends the watch rather than
+# the client, but give up on a connection that has gone silent for longer than that
+WATCH_REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_read=WATCH_TIMEOUT_SECONDS + 30)
+WATCH_MAX_BACKOFF_SECONDS = 60
+
+# Latest pod per app for /logs, keyed by (namespace, name). Kept very short so log-polling
+# UIs don't re-list pods every second but rollouts are still picked up quickly.
+LATEST_POD_CACHE_TTL = float(os.getenv("LATEST_POD_CACHE_TTL", "2"))
+_latest_pod_cache = TTLCache(maxsize=1024, ttl=LATEST_POD_CACHE_TTL)
+POD_LIST_LIMIT = 20
+
+# Pod phases whose logs are expected to be readable
+LOG_READY_PHASES = frozenset({"Running", "Succeeded"})
+# Pod logs are relayed to clients in chunks of this size instead of being buffered whole
+LOG_CHUNK_SIZE = 64 * 1024
+# Idle interval after which /logs/{name}/stream sends an SSE comment to keep the connection open
+LOG_HEARTBEAT_SECONDS = 15
+
+# Encoded /apps bodies with their ETags. Keyed by (namespace, watch resourceVersion)
+# while the watch cache is synced, so any change is a miss; otherwise by
+# (namespace, None), which is only trusted for the TTL.
+APPS_RESPONSE_CACHE_TTL = float(os.getenv("APPS_RESPONSE_CACHE_TTL", "1"))
+_apps_response_cache = TTLCache(maxsize=128, ttl=APPS_RESPONSE_CACHE_TTL)
+
+# Fire-and-forget tasks spawned by request handlers (see run_in_background), and how
+# long shutdown waits for them; stays well inside the pod's termination grace period
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "10"))
+_background_tasks = set()
 
 
 class DeploymentRequest(BaseModel):
     name: str
     image: str  # format: registry/path:tag
-    envs: Optional[Dict[str, str]] = {}
+    envs: Dict[str, str] = Field(default_factory=dict)
     namespace: Optional[str] = DEFAULT_NAMESPACE
     custom_domain: Optional[str] = None  # Optional custom domain (e.g., "myapp.example.com")
     idle_timeout: Optional[int] = None  # Seconds before scale-to-zero (None = Knative default ~60s)
@@ -64,73 +265,119 @@ MACHINE_SIZES = {
 class DeploymentResponse(BaseModel):
     name: str
     namespace: str
-    action: str  # "created" or "updated"
+    action: str  # "created", "updated" or "noop"
     status: str
     url: Optional[str] = None
 
 
+# Static parts of the Knative Service spec, built once at import and shared by every
+# spec (the Kubernetes client only serializes them, nothing mutates them)
+KNATIVE_API_VERSION = f"{KNATIVE_GROUP}/{KNATIVE_VERSION}"
+DOMAIN_MAPPING_API_VERSION = f"{KNATIVE_GROUP}/{DOMAIN_MAPPING_VERSION}"
+
+SERVICE_ANNOTATIONS = {
+    "autoscaling.knative.dev/min-scale": "0",
+    "autoscaling.knative.dev/max-scale": "10",
+    "autoscaling.knative.dev/target": "250"
+}
+
+# Hash of the desired spec, stamped on the Service so identical redeploys can be skipped
+SPEC_HASH_ANNOTATION = "calvincode.io/spec-hash"
+
+CONTAINER_PORTS = [{
+    "containerPort": 8080,
+    "protocol": "TCP"
+}]
+
+CONTAINER_RESOURCES = {
+    size: {
+        "requests": {
+            "cpu": resources["cpu_request"],
+            "memory": resources["memory_request"]
+        },
+        "limits": {
+            "cpu": resources["cpu_limit"],
+            "memory": resources["memory_limit"]
+        }
+    }
+    for size, resources in MACHINE_SIZES.items()
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def app_hostname(name: str) -> str:
+    """Primary hostname of an app (Knative auto-configures the subdomain)"""
+    return name + DOMAIN_SUFFIX
+
+
+@functools.lru_cache(maxsize=1024)
+def app_url(name: str) -> str:
+    """Primary URL of an app"""
+    return "https://" + app_hostname(name)
+
+
 def create_knative_service_spec(name: str, image: str, envs: Dict[str, str], idle_timeout: int = None, size: str = "sm") -> dict:
-    """Create Knative Service spec for customer app deployment"""
+    """Create Knative Service spec for customer app deployment.
+
+    Identical redeploys get the memoized object itself, so treat it as read-only
+    (deploy_app only reads it, and the Kubernetes client serializes it into new objects).
+    """
+    return _build_knative_service_spec(name, image, tuple(envs.items()), idle_timeout, size)
+
 
-    # Convert envs dict to list of env vars
-    env_list = [{"name": k, "value": v} for k, v in envs.items()]
+@functools.lru_cache(maxsize=256)
+def _build_knative_service_spec(name: str, image: str, env_items: tuple, idle_timeout: Optional[int], size: str) -> dict:
+    # Convert env items to list of env vars
+    env_list = [{"name": k, "value": v} for k, v in env_items]
 
     # Auto-inject service URL for self-ping keep-alive pattern
-    service_url = f"https://{name}.{DOMAIN}"
-    env_list.append({"name": "SERVICE_URL", "value": service_url})
+    env_list.append({"name": "SERVICE_URL", "value": app_url(name)})
 
     # Resolve machine size
-    resources = MACHINE_SIZES.get(size, MACHINE_SIZES["sm"])
+    resources = CONTAINER_RESOURCES.get(size, CONTAINER_RESOURCES["sm"])
+
+    annotations = SERVICE_ANNOTATIONS
+    if idle_timeout is not None:
+        annotations = {**SERVICE_ANNOTATIONS, "autoscaling.knative.dev/scale-to-zero-pod-retention-period": f"{idle_timeout}s"}
+
+    spec = {
+        "template": {
+            "metadata": {
+                "annotations": annotations
+            },
+            "spec": {
+                "containers": [{
+                    "image": image,
+                    "env": env_list,
+                    "ports": CONTAINER_PORTS,
+                    "resources": resources
+                }]
+            }
+        }
+    }
+    spec_hash = hashlib.blake2b(orjson.dumps(spec, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
 
     return {
-        "apiVersion": f"{KNATIVE_GROUP}/{KNATIVE_VERSION}",
+        "apiVersion": KNATIVE_API_VERSION,
         "kind": "Service",
         "metadata": {
             "name": name,
             "labels": {
                 "app": name,
                 "managed-by": "calvincode"
+            },
+            "annotations": {
+                SPEC_HASH_ANNOTATION: spec_hash
             }
         },
-        "spec": {
-            "template": {
-                "metadata": {
-                    "annotations": {
-                        "autoscaling.knative.dev/min-scale": "0",
-                        "autoscaling.knative.dev/max-scale": "10",
-                        "autoscaling.knative.dev/target": "250",
-                        **({"autoscaling.knative.dev/scale-to-zero-pod-retention-period": f"{idle_timeout}s"} if idle_timeout is not None else {})
-                    }
-                },
-                "spec": {
-                    "containers": [{
-                        "image": image,
-                        "env": env_list,
-                        "ports": [{
-                            "containerPort": 8080,
-                            "protocol": "TCP"
-                        }],
-                        "resources": {
-                            "requests": {
-                                "cpu": resources["cpu_request"],
-                                "memory": resources["memory_request"]
-                            },
-                            "limits": {
-                                "cpu": resources["cpu_limit"],
-                                "memory": resources["memory_limit"]
-                            }
-                        }
-                    }]
-                }
-            }
-        }
+        "spec": spec
     }
 
 
 def create_domain_mapping_spec(domain_name: str, service_name: str, namespace: str) -> dict:
     """Create DomainMapping spec for clean URL"""
     return {
-        "apiVersion": f"{KNATIVE_GROUP}/{DOMAIN_MAPPING_VERSION}",
+        "apiVersion": DOMAIN_MAPPING_API_VERSION,
         "kind": "DomainMapping",
         "metadata": {
             "name": domain_name,
@@ -140,151 +387,779 @@ def create_domain_mapping_spec(domain_name: str, service_name: str, namespace: s
             "ref": {
                 "name": service_name,
                 "kind": "Service",
-                "apiVersion": f"{KNATIVE_GROUP}/{KNATIVE_VERSION}"
+                "apiVersion": KNATIVE_API_VERSION
             }
         }
     }
 
 
-def get_knative_service(name: str, namespace: str):
-    """Get Knative Service if it exists"""
+async def apiserver_call(call, **kwargs):
+    """Issue an apiserver request within the in-flight request budget"""
+    async with _apiserver_semaphore:
+        return await call(**kwargs)
+
+
+async def apiserver_write(write, **kwargs):
+    """Issue an apiserver write under the client-side rate limit, retrying when throttled"""
+    for attempt in range(K8S_THROTTLE_RETRIES + 1):
+        async with _apiserver_write_limiter:
+            try:
+                return await apiserver_call(write, **kwargs)
+            except ApiException as e:
+                if e.status != 429 or attempt == K8S_THROTTLE_RETRIES:
+                    raise
+                retry_after = e.headers.get("Retry-After") if e.headers else None
+
+        # Honor the apiserver's Retry-After, else back off exponentially
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = 2 ** attempt
+        logger.warning("Apiserver throttled write, retrying in %ss", delay)
+        await asyncio.sleep(min(delay, K8S_MAX_RETRY_AFTER_SECONDS))
+
+
+async def _fetch_custom_object(key: tuple, version: str):
+    plural, namespace, name = key
     try:
-        return custom_api.get_namespaced_custom_object(
+        result = await apiserver_call(
+            custom_api.get_namespaced_custom_object,
             group=KNATIVE_GROUP,
-            version=KNATIVE_VERSION,
+            version=version,
             namespace=namespace,
-            plural=KNATIVE_SERVICE_PLURAL,
+            plural=plural,
             name=name
         )
     except ApiException as e:
-        if e.status == 404:
-            return None
-        raise
+        if e.status != 404:
+            raise
+        result = None
 
+    # Only cache if no write invalidated the key while this GET was in flight
+    if _existence_inflight.get(key) is asyncio.current_task():
+        _existence_cache[key] = result
+    return result
 
-def get_domain_mapping(domain_name: str, namespace: str):
-    """Get DomainMapping if it exists"""
-    try:
-        return custom_api.get_namespaced_custom_object(
+
+def _forget_inflight(key: tuple, task: asyncio.Task):
+    if _existence_inflight.get(key) is task:
+        del _existence_inflight[key]
+
+
+async def _get_custom_object_cached(version: str, plural: str, name: str, namespace: str):
+    """Get a custom object through the existence cache; concurrent lookups of the same key share one GET"""
+    key = (plural, namespace, name)
+    cached = _existence_cache.get(key, _CACHE_MISS)
+    if cached is not _CACHE_MISS:
+        return cached
+
+    task = _existence_inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_fetch_custom_object(key, version))
+        _existence_inflight[key] = task
+        task.add_done_callback(functools.partial(_forget_inflight, key))
+
+    # Shield the shared GET so one caller disconnecting doesn't cancel it for the others
+    return await asyncio.shield(task)
+
+
+def invalidate_cached_object(plural: str, name: str, namespace: str):
+    """Drop a cached existence check after the object was written or deleted"""
+    key = (plural, namespace, name)
+    _existence_cache.pop(key, None)
+    _existence_inflight.pop(key, None)
+
+
+async def get_knative_service(name: str, namespace: str):
+    """Get Knative Service if it exists"""
+    # Served from the watch cache while it's synced. A miss still falls back to a GET,
+    # since a Service applied a moment ago may not have come through the watch yet
+    if knative_service_cache.synced:
+        service = knative_service_cache.get(namespace, name)
+        if service is not None:
+            return service
+    return await _get_custom_object_cached(KNATIVE_VERSION, KNATIVE_SERVICE_PLURAL, name, namespace)
+
+
+async def list_knative_services(namespace: str) -> dict:
+    """Live LIST of the Knative Services in a namespace; concurrent callers share one request"""
+    task = _list_inflight.get(namespace)
+    if task is None:
+        task = asyncio.create_task(apiserver_call(
+            custom_api.list_namespaced_custom_object,
             group=KNATIVE_GROUP,
-            version=DOMAIN_MAPPING_VERSION,
+            version=KNATIVE_VERSION,
             namespace=namespace,
-            plural=DOMAIN_MAPPING_PLURAL,
-            name=domain_name
-        )
-    except ApiException as e:
-        if e.status == 404:
-            return None
-        raise
+            plural=KNATIVE_SERVICE_PLURAL
+        ))
+        _list_inflight[namespace] = task
+        task.add_done_callback(lambda _: _list_inflight.pop(namespace, None))
 
+    # Shield the shared LIST so one caller disconnecting doesn't cancel it for the others
+    return await asyncio.shield(task)
 
-def create_or_update_domain_mapping(domain_name: str, service_name: str, namespace: str):
+
+async def get_domain_mapping(domain_name: str, namespace: str):
+    """Get DomainMapping if it exists"""
+    return await _get_custom_object_cached(DOMAIN_MAPPING_VERSION, DOMAIN_MAPPING_PLURAL, domain_name, namespace)
+
+
+class WatchCache(ABC):
+    """In-memory mirror of a cluster-wide resource, kept current by LIST + WATCH"""
+
+    kind = "object"
+
+    def __init__(self):
+        self.resource_version = None
+        self.synced = False
+
+    @abstractmethod
+    def _list_call(self):
+        """The cluster-wide list function to LIST and WATCH with, and its arguments"""
+
+    @abstractmethod
+    def _load(self, result):
+        """Replace the cache contents with a LIST result, returning its resourceVersion"""
+
+    @abstractmethod
+    def _apply(self, event_type: str, event: dict):
+        """Update the cache from a watch event"""
+
+    async def _relist(self):
+        list_func, kwargs = self._list_call()
+        self.resource_version = self._load(await list_func(**kwargs))
+        self.synced = True
+
+    async def run(self):
+        """Keep the cache in sync until cancelled, re-listing after errors with exponential backoff"""
+        list_func, kwargs = self._list_call()
+        backoff = 1
+        while True:
+            try:
+                if self.resource_version is None:
+                    await self._relist()
+
+                async with watch.Watch() as w:
+                    async for event in w.stream(
+                        list_func,
+                        resource_version=self.resource_version,
+                        allow_watch_bookmarks=True,
+                        timeout_seconds=WATCH_TIMEOUT_SECONDS,
+                        _request_timeout=WATCH_REQUEST_TIMEOUT,
+                        **kwargs
+                    ):
+                        if event["type"] != "BOOKMARK":
+                            self._apply(event["type"], event)
+                        self.resource_version = event["raw_object"]["metadata"]["resourceVersion"]
+
+                backoff = 1
+                continue
+
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                # The connection went quiet; resume from where the watch left off
+                logger.info("%s watch timed out, reconnecting", self.kind)
+                continue
+            except ApiException as e:
+                if e.status == 410:
+                    # Our resourceVersion is too old to resume from, start over with a fresh LIST
+                    logger.info("%s watch expired, re-listing", self.kind)
+                    self.resource_version = None
+                    continue
+                logger.warning("%s watch failed: %s - %s", self.kind, e.status, e.reason)
+            except Exception as e:
+                logger.warning("%s watch failed: %s", self.kind, e)
+
+            # Serve live LISTs until the cache has been rebuilt
+            self.synced = False
+            self.resource_version = None
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, WATCH_MAX_BACKOFF_SECONDS)
+
+
+class KnativeServiceWatchCache(WatchCache):
+    """Knative Services by namespace, backing /apps"""
+
+    kind = "Knative Service"
+
+    def __init__(self):
+        super().__init__()
+        self.services = {}  # namespace -> {name: service}
+
+    def get(self, namespace: str, name: str) -> Optional[dict]:
+        """A Service by name, or None if it isn't in the cache"""
+        return self.services.get(namespace, {}).get(name)
+
+    def list(self, namespace: str) -> list:
+        """Services in a namespace, ordered by name like an apiserver LIST"""
+        services = self.services.get(namespace, {})
+        return [services[name] for name in sorted(services)]
+
+    def _list_call(self):
+        return custom_api.list_cluster_custom_object, {
+            "group": KNATIVE_GROUP,
+            "version": KNATIVE_VERSION,
+            "plural": KNATIVE_SERVICE_PLURAL
+        }
+
+    def _load(self, result):
+        services = {}
+        for item in result.get("items", []):
+            metadata = item["metadata"]
+            services.setdefault(metadata["namespace"], {})[metadata["name"]] = item
+
+        self.services = services
+        logger.info("Knative Service cache synced: %s services", len(result.get("items", [])))
+        return result["metadata"]["resourceVersion"]
+
+    def _apply(self, event_type: str, event: dict):
+        item = event["raw_object"]
+        metadata = item["metadata"]
+        if event_type == "DELETED":
+            self.services.get(metadata["namespace"], {}).pop(metadata["name"], None)
+        else:
+            self.services.setdefault(metadata["namespace"], {})[metadata["name"]] = item
+
+
+class KnativePodWatchCache(WatchCache):
+    """Pods of Knative Services keyed by (namespace, service name), backing /logs"""
+
+    kind = "Knative pod"
+
+    def __init__(self):
+        super().__init__()
+        self.pods = {}  # (namespace, service) -> {pod name: V1Pod}
+
+    def list(self, namespace: str, service: str) -> list:
+        """Pods currently backing a service"""
+        return list(self.pods.get((namespace, service), {}).values())
+
+    def _list_call(self):
+        # Only pods that belong to a Knative Service
+        return core_v1.list_pod_for_all_namespaces, {"label_selector": POD_SERVICE_LABEL}
+
+    @staticmethod
+    def _key(pod) -> tuple:
+        return pod.metadata.namespace, pod.metadata.labels[POD_SERVICE_LABEL]
+
+    def _load(self, result):
+        pods = {}
+        for pod in result.items:
+            pods.setdefault(self._key(pod), {})[pod.metadata.name] = pod
+
+        self.pods = pods
+        logger.info("Knative pod cache synced: %s pods", len(result.items))
+        return result.metadata.resource_version
+
+    def _apply(self, event_type: str, event: dict):
+        pod = event["object"]
+        key = self._key(pod)
+        if event_type == "DELETED":
+            service_pods = self.pods.get(key, {})
+            service_pods.pop(pod.metadata.name, None)
+            if not service_pods:
+                self.pods.pop(key, None)
+        else:
+            self.pods.setdefault(key, {})[pod.metadata.name] = pod
+
+
+knative_service_cache = KnativeServiceWatchCache()
+knative_pod_cache = KnativePodWatchCache()
+
+
+async def create_or_update_domain_mapping(domain_name: str, service_name: str, namespace: str):
     """Create or update DomainMapping for a domain"""
+    key = (namespace, domain_name)
+    if _applied_domain_mappings.get(key) == service_name:
+        logger.debug("DomainMapping recently applied: %s -> %s", domain_name, service_name)
+        return
+
     try:
-        existing = get_domain_mapping(domain_name, namespace)
         mapping_spec = create_domain_mapping_spec(domain_name, service_name, namespace)
 
-        if existing is None:
-            logger.info(f"Creating DomainMapping: {domain_name} -> {service_name}")
-            custom_api.create_namespaced_custom_object(
-                group=KNATIVE_GROUP,
-                version=DOMAIN_MAPPING_VERSION,
-                namespace=namespace,
-                plural=DOMAIN_MAPPING_PLURAL,
-                body=mapping_spec
-            )
-        else:
-            logger.info(f"DomainMapping already exists: {domain_name}")
+        # Server-side apply creates the mapping or repoints an existing one in a
+        # single request, with no existence GET
+        logger.info("Applying DomainMapping: %s -> %s", domain_name, service_name)
+        await apiserver_write(
+            custom_api.patch_namespaced_custom_object,
+            group=KNATIVE_GROUP,
+            version=DOMAIN_MAPPING_VERSION,
+            namespace=namespace,
+            plural=DOMAIN_MAPPING_PLURAL,
+            name=domain_name,
+            body=mapping_spec,
+            field_manager=FIELD_MANAGER,
+            force=True,
+            _content_type=APPLY_PATCH_CONTENT_TYPE
+        )
+        invalidate_cached_object(DOMAIN_MAPPING_PLURAL, domain_name, namespace)
+        _applied_domain_mappings[key] = service_name
 
     except ApiException as e:
-        logger.error(f"Failed to create DomainMapping: {e.status} - {e.reason}")
+        logger.error("Failed to apply DomainMapping: %s - %s", e.status, e.reason)
         # Don't fail the deployment if DomainMapping fails
     except Exception as e:
-        logger.error(f"Unexpected error creating DomainMapping: {str(e)}")
+        logger.error("Unexpected error applying DomainMapping: %s", e)
 
 
-def delete_domain_mapping(domain_name: str, namespace: str):
+async def delete_domain_mapping(domain_name: str, namespace: str):
     """Delete DomainMapping for a specific domain"""
     try:
-        existing = get_domain_mapping(domain_name, namespace)
-
-        if existing is not None:
-            logger.info(f"Deleting DomainMapping: {domain_name}")
-            custom_api.delete_namespaced_custom_object(
+        # Delete directly; a 404 just means there was nothing to delete
+        logger.info("Deleting DomainMapping: %s", domain_name)
+        try:
+            await apiserver_write(
+                custom_api.delete_namespaced_custom_object,
                 group=KNATIVE_GROUP,
                 version=DOMAIN_MAPPING_VERSION,
                 namespace=namespace,
                 plural=DOMAIN_MAPPING_PLURAL,
                 name=domain_name
             )
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            logger.debug("DomainMapping already gone: %s", domain_name)
+        invalidate_cached_object(DOMAIN_MAPPING_PLURAL, domain_name, namespace)
+        _applied_domain_mappings.pop((namespace, domain_name), None)
     except ApiException as e:
-        logger.error(f"Failed to delete DomainMapping: {e.status} - {e.reason}")
+        logger.error("Failed to delete DomainMapping: %s - %s", e.status, e.reason)
     except Exception as e:
-        logger.error(f"Unexpected error deleting DomainMapping: {str(e)}")
+        logger.error("Unexpected error deleting DomainMapping: %s", e)
 
 
-def purge_cloudflare_cache(domain: str):
-    """Purge Cloudflare cache for a domain after deployment"""
+async def get_latest_pod(name: str, namespace: str):
+    """Get the most recently created pod of a Knative Service, preferring running pods"""
+    # Resolve from the pod watch cache while it's synced, else fall back to a live LIST
+    if knative_pod_cache.synced:
+        pods = knative_pod_cache.list(namespace, name)
+        running = [p for p in pods if p.status.phase == "Running"]
+        pods = running or pods
+        if not pods:
+            return None
+        return max(pods, key=lambda p: p.metadata.creation_timestamp)
+
+    key = (namespace, name)
+    latest_pod = _latest_pod_cache.get(key)
+    if latest_pod is not None:
+        return latest_pod
+
+    label_selector = POD_LABEL_SELECTOR_PREFIX + name
+
+    # Let the apiserver filter down to running pods; only fall back to every
+    # phase (pending, scaled-down leftovers...) if none are running.
+    # resource_version="0" serves the list from the apiserver watch cache
+    # instead of a quorum read from etcd; it may be slightly stale, which is
+    # fine for picking a pod to tail logs from.
+    pods = await apiserver_call(
+        core_v1.list_namespaced_pod,
+        namespace=namespace,
+        label_selector=label_selector,
+        field_selector="status.phase=Running",
+        resource_version="0",
+        limit=POD_LIST_LIMIT
+    )
+    if not pods.items:
+        pods = await apiserver_call(
+            core_v1.list_namespaced_pod,
+            namespace=namespace,
+            label_selector=label_selector,
+            resource_version="0",
+            limit=POD_LIST_LIMIT
+        )
+    if not pods.items:
+        return None
+
+    latest_pod = max(pods.items, key=lambda p: p.metadata.creation_timestamp)
+    _latest_pod_cache[key] = latest_pod
+    return latest_pod
+
+
+async def open_pod_log(pod_name: str, namespace: str, **kwargs):
+    """Open the user container log as a raw (unbuffered) response, raising ApiException on errors"""
+    if kwargs.get("follow"):
+        kwargs["_request_timeout"] = FOLLOW_LOG_REQUEST_TIMEOUT
+    # Only opening the stream counts against the budget, not reading it
+    resp = await apiserver_call(
+        core_v1.read_namespaced_pod_log,
+        name=pod_name,
+        namespace=namespace,
+        container="user-container",
+        _preload_content=False,
+        **kwargs
+    )
+    # Unpreloaded responses skip the client's status check
+    if not 200 <= resp.status <= 299:
+        exc = ApiException(status=resp.status, reason=resp.reason)
+        exc.body = await resp.text()
+        resp.release()
+        raise exc
+    return resp
+
+
+async def stream_logs_json(envelope: dict, resp):
+    """Stream {**envelope, "logs": <pod log>} as JSON without holding the whole log in memory"""
+    yield orjson.dumps(envelope)[:-1] + b',"logs":"'
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    try:
+        async for chunk in resp.content.iter_chunked(LOG_CHUNK_SIZE):
+            text = decoder.decode(chunk)
+            if text:
+                # Encode as a JSON string and strip the surrounding quotes
+                yield orjson.dumps(text)[1:-1]
+        text = decoder.decode(b"", final=True)
+        if text:
+            yield orjson.dumps(text)[1:-1]
+    finally:
+        resp.release()
+    yield b'"}'
+
+
+def weak_etag(resource_version: str) -> str:
+    """Weak ETag for a response derived from Kubernetes state at resource_version"""
+    return f'W/"{resource_version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already covers etag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+async def drain_background_tasks(timeout: float):
+    """Wait up to timeout for run_in_background tasks, cancelling any still running"""
+    if not _background_tasks:
+        return
+    logger.info("Waiting for %s background tasks", len(_background_tasks))
+    _, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+def run_in_background(coro) -> asyncio.Task:
+    """Schedule a fire-and-forget coroutine, keeping a reference so it isn't garbage collected mid-flight"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def invalidate_analytics(hosts: List[str]):
+    """Drop cached analytics responses filtered on any of the given hosts"""
+    hosts = set(hosts)
+    for key in [key for key in _analytics_cache if key[1] in hosts]:
+        _analytics_cache.pop(key, None)
+
+
+async def purge_cloudflare_cache(domains: List[str]):
+    """Purge Cloudflare cache for the domains of a deployment in one API call"""
     try:
-        url = f"https://api.cloudflare.com/client/v4/zones/{CLOUDFLARE_ZONE_ID}/purge_cache"
-        headers = {
-            "Authorization": f"Bearer {CLOUDFLARE_API_TOKEN}",
-            "Content-Type": "application/json"
-        }
         # Use 'hosts' for hostname-based purging (not 'prefixes' which expects URL paths)
         data = {
-            "hosts": [domain]
+            "hosts": domains
         }
 
-        logger.info(f"Purging Cloudflare cache for {domain}")
-        response = requests.post(url, json=data, headers=headers, timeout=10)
+        logger.info("Purging Cloudflare cache for %s", ", ".join(domains))
+        response = await cloudflare_client.post(f"/zones/{CLOUDFLARE_ZONE_ID}/purge_cache", content=orjson.dumps(data), timeout=10)
 
         if response.status_code == 200:
-            logger.info(f"Successfully purged Cloudflare cache for {domain}")
+            logger.info("Successfully purged Cloudflare cache for %s", ", ".join(domains))
+            invalidate_analytics(domains)
         else:
-            logger.warning(f"Cloudflare cache purge failed: {response.status_code} - {response.text}")
+            logger.warning("Cloudflare cache purge failed: %s - %s", response.status_code, response.text)
 
     except Exception as e:
-        logger.error(f"Error purging Cloudflare cache: {str(e)}")
+        logger.error("Error purging Cloudflare cache: %s", e)
         # Don't fail the deployment if cache purge fails
 
 
-def warm_up_service(service_url: str):
-    """Make a warm-up request to trigger pod creation and image pull"""
+class CloudflarePurgeBatcher:
+    """Coalesces cache purges from concurrent deploys into one API call per window"""
+
+    def __init__(self, max_hosts: int = PURGE_BATCH_MAX_HOSTS, window: float = PURGE_BATCH_WINDOW_SECONDS):
+        self.max_hosts = max_hosts
+        self.window = window
+        self.stopped = False
+        self._queue = asyncio.Queue()
+        self._carry = None  # request that didn't fit in the previous batch
+
+    async def purge(self, domains: List[str]):
+        """Queue domains for purging, returning once the batch holding them has been sent.
+
+        Raises CancelledError if the batcher stops before sending them.
+        """
+        if self.stopped:
+            logger.warning("Purge batcher stopped, not purging %s", ", ".join(domains))
+            return
+        done = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((domains, done))
+        await done
+
+    async def _next(self, timeout: Optional[float] = None):
+        if self._carry is not None:
+            request, self._carry = self._carry, None
+            return request
+        if timeout is None:
+            return await self._queue.get()
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    async def run(self):
+        """Send batched purges until cancelled"""
+        try:
+            while True:
+                await self._send_batch()
+        finally:
+            self.stopped = True
+            self._abandon_queued()
+
+    async def _send_batch(self):
+        loop = asyncio.get_running_loop()
+        domains, done = await self._next()
+        hosts = dict.fromkeys(domains)  # ordered de-duplication
+        waiters = [done]
+        try:
+            deadline = loop.time() + self.window
+            while len(hosts) < self.max_hosts:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    request = await self._next(remaining)
+                except asyncio.TimeoutError:
+                    break
+                if len(hosts.keys() | request[0]) > self.max_hosts:
+                    self._carry = request
+                    break
+                hosts.update(dict.fromkeys(request[0]))
+                waiters.append(request[1])
+
+            await purge_cloudflare_cache(list(hosts))
+        except BaseException:
+            # Stopped mid-batch: release the callers instead of leaving them waiting
+            for waiter in waiters:
+                waiter.cancel()
+            raise
+
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _abandon_queued(self):
+        """Release callers whose purges will no longer be sent"""
+        requests = [self._carry] if self._carry is not None else []
+        self._carry = None
+        while not self._queue.empty():
+            requests.append(self._queue.get_nowait())
+        for _, done in requests:
+            done.cancel()
+
+
+purge_batcher = CloudflarePurgeBatcher()
+
+
+async def warm_up_service(service_url: str):
+    """Make a warm-up request to trigger pod creation and image pull.
+
+    While the purge is still propagating the edge may answer from cache without
+    reaching the pod, so retry with backoff until Cloudflare reports anything
+    other than a cache HIT.
+    """
     try:
-        logger.info(f"Warming up service: {service_url}")
-        response = requests.get(service_url, timeout=15)
-        logger.info(f"Warm-up complete - Status: {response.status_code}, Pod is now running with new image")
-    except requests.exceptions.Timeout:
-        logger.warning(f"Warm-up request timed out (cold start may take longer than expected)")
+        logger.info("Warming up service: %s", service_url)
+        for delay in (*WARMUP_RETRY_DELAYS, None):
+            response = await http_client.get(service_url, timeout=15, follow_redirects=True)
+            if delay is None or response.headers.get("CF-Cache-Status") != "HIT":
+                break
+            await asyncio.sleep(delay)
+        logger.info("Warm-up complete - Status: %s, Pod is now running with new image", response.status_code)
+    except httpx.TimeoutException:
+        logger.warning("Warm-up request timed out (cold start may take longer than expected)")
     except Exception as e:
-        logger.warning(f"Warm-up request failed: {str(e)}")
+        logger.warning("Warm-up request failed: %s", e)
         # Don't fail the deployment if warm-up fails
 
 
+async def run_post_deploy(subdomain: str, clean_url: str, custom_domain: Optional[str] = None):
+    """Purge Cloudflare caches for a fresh deploy, then warm up the service"""
+    # Purge Cloudflare cache for subdomain and custom domain, batched with any
+    # other deploys in flight
+    domains = [subdomain]
+    if custom_domain:
+        domains.append(custom_domain)
+    await purge_batcher.purge(domains)
+
+    # Warm up the service to trigger pod creation and image pull (using primary URL),
+    # retrying until the purge has reached the edge
+    await warm_up_service(clean_url)
+
+
+# Constant payloads, encoded once at import
+ROOT_BODY = orjson.dumps({
+    "service": "CalvinCode Deployment API",
+    "version": "2.0.0",
+    "platform": "Knative Serving",
+    "endpoints": {
+        "health": "/health",
+        "analytics": "/analytics (GET)",
+        "web_analytics": "/web-analytics (GET)",
+        "web_performance": "/web-performance (GET)",
+        "deploy": "/deploy (POST)",
+        "list": "/apps (GET)",
+        "get": "/apps/{namespace}/{name} (GET)",
+        "delete": "/apps/{namespace}/{name} (DELETE)",
+        "logs": "/logs/{name} (GET)"
+    }
+})
+HEALTH_BODY = orjson.dumps({"status": "healthy"})
+
+
 @app.get("/")
 async def root():
-    return {
-        "service": "CalvinCode Deployment API",
-        "version": "2.0.0",
-        "platform": "Knative Serving",
-        "endpoints": {
-            "health": "/health",
-            "analytics": "/analytics (GET)",
-            "web_analytics": "/web-analytics (GET)",
-            "web_performance": "/web-performance (GET)",
-            "deploy": "/deploy (POST)",
-            "list": "/apps (GET)",
-            "get": "/apps/{namespace}/{name} (GET)",
-            "delete": "/apps/{namespace}/{name} (DELETE)",
-            "logs": "/logs/{name} (GET)"
-        }
-    }
+    return Response(content=ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return Response(content=HEALTH_BODY, media_type="application/json")
+
+
+async def cloudflare_graphql(query: str, variables: dict) -> httpx.Response:
+    """POST an analytics query, retrying when Cloudflare throttles or its gateway fails"""
+    body = orjson.dumps({"query": query, "variables": variables})
+    for attempt in range(CLOUDFLARE_RETRIES + 1):
+        response = await cloudflare_client.post("/graphql", content=body)
+        if response.status_code not in CLOUDFLARE_RETRY_STATUSES or attempt == CLOUDFLARE_RETRIES:
+            return response
+
+        # Honor Cloudflare's Retry-After, else back off exponentially
+        try:
+            delay = float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            delay = CLOUDFLARE_RETRY_BACKOFF_SECONDS * 2 ** attempt
+        logger.warning("Cloudflare GraphQL answered %s, retrying in %ss", response.status_code, delay)
+        await asyncio.sleep(min(delay, CLOUDFLARE_MAX_RETRY_AFTER_SECONDS))
+
+
+# Analytics GraphQL queries, built once at import. Each has a variant filtered on
+# a single host, which is passed as the $host variable rather than spliced into
+# the query text.
+def _host_filtered_queries(template: str, host_field: str):
+    """Return the (unfiltered, host-filtered) variants of an analytics query"""
+    return (
+        template % {"host_var": "", "host_filter": ""},
+        template % {"host_var": ", $host: string", "host_filter": f", {host_field}: $host"}
+    )
+
+
+# GraphQL query for metrics
+ANALYTICS_QUERY, ANALYTICS_HOST_QUERY = _host_filtered_queries("""
+query GetMetrics($zoneTag: string, $startTime: Time!, $endTime: Time!%(host_var)s) {
+    viewer {
+        zones(filter: { zoneTag: $zoneTag }) {
+            httpRequestsAdaptiveGroups(
+                filter: {
+                    datetime_geq: $startTime,
+                    datetime_lt: $endTime%(host_filter)s
+                },
+                limit: 1000,
+                orderBy: [datetimeHour_DESC]
+            ) {
+                count
+                dimensions {
+                    datetimeHour
+                    clientRequestHTTPHost
+                    edgeResponseStatus
+                }
+            }
+        }
+    }
+}
+""", "clientRequestHTTPHost")
+
+# GraphQL query for Web Analytics (RUM) page loads
+WEB_ANALYTICS_QUERY, WEB_ANALYTICS_HOST_QUERY = _host_filtered_queries("""
+query PageLoads($accountTag: string, $startTime: Time!, $endTime: Time!%(host_var)s) {
+    viewer {
+        accounts(filter: { accountTag: $accountTag }) {
+            rumPageloadEventsAdaptiveGroups(
+                filter: {
+                    datetime_geq: $startTime,
+                    datetime_lt: $endTime%(host_filter)s
+                },
+                limit: 1000,
+                orderBy: [datetimeHour_DESC]
+            ) {
+                count
+                dimensions {
+                    datetimeHour
+                    requestHost
+                    requestPath
+                }
+                sum {
+                    visits
+                }
+            }
+        }
+    }
+}
+""", "requestHost")
+
+# GraphQL query for Web Performance metrics - combine timing and web vitals
+WEB_PERFORMANCE_QUERY, WEB_PERFORMANCE_HOST_QUERY = _host_filtered_queries("""
+query WebPerformance($accountTag: string, $startTime: Time!, $endTime: Time!%(host_var)s) {
+    viewer {
+        accounts(filter: { accountTag: $accountTag }) {
+            performance: rumPerformanceEventsAdaptiveGroups(
+                filter: {
+                    datetime_geq: $startTime,
+                    datetime_lt: $endTime%(host_filter)s
+                },
+                limit: 1000,
+                orderBy: [datetimeHour_DESC]
+            ) {
+                count
+                dimensions {
+                    datetimeHour
+                    requestHost
+                }
+                quantiles {
+                    pageLoadTimeP75
+                    dnsTimeP75
+                    connectionTimeP75
+                    requestTimeP75
+                    responseTimeP75
+                    firstContentfulPaintP75
+                }
+            }
+            webVitals: rumWebVitalsEventsAdaptiveGroups(
+                filter: {
+                    datetime_geq: $startTime,
+                    datetime_lt: $endTime%(host_filter)s
+                },
+                limit: 1000,
+                orderBy: [datetimeHour_DESC]
+            ) {
+                count
+                dimensions {
+                    datetimeHour
+                    requestHost
+                }
+                quantiles {
+                    largestContentfulPaintP75
+                    firstInputDelayP75
+                    cumulativeLayoutShiftP75
+                    timeToFirstByteP75
+                    firstContentfulPaintP75
+                }
+            }
+        }
+    }
+}
+""", "requestHost")
 
 
 @app.get("/analytics")
@@ -303,20 +1178,13 @@ async def get_analytics(
         Analytics data with requests, bandwidth, status codes, latency
     """
     try:
-        from datetime import datetime, timedelta
-
         # Calculate time range
-        end_time = datetime.utcnow()
+        end_time = datetime.now(timezone.utc)
         start_time = end_time - timedelta(hours=hours)
+        start_iso = start_time.isoformat().replace("+00:00", "Z")
+        end_iso = end_time.isoformat().replace("+00:00", "Z")
 
-        # Cloudflare GraphQL endpoint
-        graphql_url = "https://api.cloudflare.com/client/v4/graphql"
-        headers = {
-            "Authorization": f"Bearer {CLOUDFLARE_API_TOKEN}",
-            "Content-Type": "application/json"
-        }
-
-        # Build hostname filter
+        # Resolve the hostname to filter on
         if service_name:
             # If service_name is a full domain (has dots), use as-is
             # Otherwise append default domain
@@ -324,61 +1192,44 @@ async def get_analytics(
                 hostname = service_name
             else:
                 hostname = f"{service_name}.{DOMAIN}" if "." not in service_name else service_name
-            hostname_filter = f', clientRequestHTTPHost: "{hostname}"'
         else:
-            hostname_filter = ""
-
-        # GraphQL query for metrics
-        query = """
-        query GetMetrics($zoneTag: string, $startTime: Time!, $endTime: Time!) {
-            viewer {
-                zones(filter: { zoneTag: $zoneTag }) {
-                    httpRequestsAdaptiveGroups(
-                        filter: {
-                            datetime_geq: $startTime,
-                            datetime_lt: $endTime%s
-                        },
-                        limit: 1000,
-                        orderBy: [datetimeHour_DESC]
-                    ) {
-                        count
-                        dimensions {
-                            datetimeHour
-                            clientRequestHTTPHost
-                            edgeResponseStatus
-                        }
-                    }
-                }
-            }
-        }
-        """ % hostname_filter
+            hostname = None
+
+        cache_key = ("analytics", hostname, hours)
+        cached = _analytics_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
         variables = {
             "zoneTag": CLOUDFLARE_ZONE_ID,
-            "startTime": start_time.isoformat() + "Z",
-            "endTime": end_time.isoformat() + "Z"
+            "startTime": start_iso,
+            "endTime": end_iso
         }
+        if hostname:
+            query = ANALYTICS_HOST_QUERY
+            variables["host"] = hostname
+        else:
+            query = ANALYTICS_QUERY
 
         # Make request to Cloudflare
-        logger.info(f"Querying Cloudflare analytics: {start_time} to {end_time}")
-        response = requests.post(
-            graphql_url,
-            headers=headers,
-            json={"query": query, "variables": variables},
-            timeout=30
-        )
+        logger.info("Querying Cloudflare analytics: %s to %s", start_time, end_time)
+        response = await cloudflare_graphql(query, variables)
         response.raise_for_status()
 
-        result = response.json()
+        result = orjson.loads(response.content)
 
         # Parse and format response
-        if "errors" in result and result["errors"] is not None:
+        errors = result.get("errors")
+        if errors:
             raise HTTPException(
                 status_code=500,
-                detail=f"Cloudflare API error: {result['errors']}"
+                detail=f"Cloudflare API error: {errors}"
             )
 
-        groups = result.get("data", {}).get("viewer", {}).get("zones", [{}])[0].get("httpRequestsAdaptiveGroups", [])
+        try:
+            groups = result["data"]["viewer"]["zones"][0]["httpRequestsAdaptiveGroups"]
+        except (KeyError, IndexError, TypeError):
+            groups = []
 
         # Transform to readable format
         metrics = []
@@ -405,26 +1256,30 @@ async def get_analytics(
         total_requests = sum(m["requests"] for m in metrics)
         unique_services = len(set(m["service_name"] for m in metrics))
 
-        return {
+        payload = {
             "summary": {
                 "total_requests": total_requests,
                 "unique_services": unique_services,
                 "unique_hostnames": len(set(m["hostname"] for m in metrics)),
                 "time_range": {
-                    "start": start_time.isoformat() + "Z",
-                    "end": end_time.isoformat() + "Z",
+                    "start": start_iso,
+                    "end": end_iso,
                     "hours": hours
                 }
             },
             "metrics": metrics,
             "count": len(metrics)
         }
+        _analytics_cache[cache_key] = payload
+        return payload
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Cloudflare API request error: {str(e)}")
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
+        logger.error("Cloudflare API request error: %s", e)
         raise HTTPException(status_code=502, detail=f"Cloudflare API error: {str(e)}")
     except Exception as e:
-        logger.error(f"Analytics error: {str(e)}", exc_info=True)
+        logger.error("Analytics error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error: {type(e).__name__}: {str(e)}")
 
 
@@ -444,79 +1299,48 @@ async def get_web_analytics(
         Web analytics data with page loads, visits by host and path
     """
     try:
-        from datetime import datetime, timedelta
-
         # Calculate time range
-        end_time = datetime.utcnow()
+        end_time = datetime.now(timezone.utc)
         start_time = end_time - timedelta(hours=hours)
+        # The RUM datasets take whole-second timestamps
+        start_iso = start_time.isoformat(timespec="seconds").replace("+00:00", "Z")
+        end_iso = end_time.isoformat(timespec="seconds").replace("+00:00", "Z")
 
-        # Cloudflare GraphQL endpoint
-        graphql_url = "https://api.cloudflare.com/client/v4/graphql"
-        headers = {
-            "Authorization": f"Bearer {CLOUDFLARE_API_TOKEN}",
-            "Content-Type": "application/json"
-        }
-
-        # Build hostname filter for the GraphQL query
-        if host:
-            host_filter = f', requestHost: "{host}"'
-        else:
-            host_filter = ""
-
-        # GraphQL query for Web Analytics (RUM) page loads
-        query = """
-        query PageLoads($accountTag: string, $startTime: Time!, $endTime: Time!) {
-            viewer {
-                accounts(filter: { accountTag: $accountTag }) {
-                    rumPageloadEventsAdaptiveGroups(
-                        filter: {
-                            datetime_geq: $startTime,
-                            datetime_lt: $endTime%s
-                        },
-                        limit: 1000,
-                        orderBy: [datetimeHour_DESC]
-                    ) {
-                        count
-                        dimensions {
-                            datetimeHour
-                            requestHost
-                            requestPath
-                        }
-                        sum {
-                            visits
-                        }
-                    }
-                }
-            }
-        }
-        """ % host_filter
+        cache_key = ("web-analytics", host, hours)
+        cached = _analytics_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
         variables = {
             "accountTag": CLOUDFLARE_ACCOUNT_ID,
-            "startTime": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-            "endTime": end_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+            "startTime": start_iso,
+            "endTime": end_iso
         }
+        if host:
+            query = WEB_ANALYTICS_HOST_QUERY
+            variables["host"] = host
+        else:
+            query = WEB_ANALYTICS_QUERY
 
         # Make request to Cloudflare
-        logger.info(f"Querying Cloudflare Web Analytics: {start_time} to {end_time}")
-        response = requests.post(
-            graphql_url,
-            headers=headers,
-            json={"query": query, "variables": variables},
-            timeout=30
-        )
+        logger.info("Querying Cloudflare Web Analytics: %s to %s", start_time, end_time)
+        response = await cloudflare_graphql(query, variables)
         response.raise_for_status()
 
-        result = response.json()
+        result = orjson.loads(response.content)
 
         # Parse and format response
-        if "errors" in result and result["errors"] is not None:
+        errors = result.get("errors")
+        if errors:
             raise HTTPException(
                 status_code=500,
-                detail=f"Cloudflare API error: {result['errors']}"
+                detail=f"Cloudflare API error: {errors}"
             )
 
-        groups = result.get("data", {}).get("viewer", {}).get("accounts", [{}])[0].get("rumPageloadEventsAdaptiveGroups", [])
+        try:
+            groups = result["data"]["viewer"]["accounts"][0]["rumPageloadEventsAdaptiveGroups"]
+        except (KeyError, IndexError, TypeError):
+            groups = []
 
         # Transform to readable format
         page_views = []
@@ -539,27 +1363,31 @@ async def get_web_analytics(
         unique_hosts = len(set(pv["host"] for pv in page_views if pv["host"]))
         unique_paths = len(set(f"{pv['host']}{pv['path']}" for pv in page_views))
 
-        return {
+        payload = {
             "summary": {
                 "total_page_loads": total_page_loads,
                 "total_visits": total_visits,
                 "unique_hosts": unique_hosts,
                 "unique_paths": unique_paths,
                 "time_range": {
-                    "start": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                    "end": end_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "start": start_iso,
+                    "end": end_iso,
                     "hours": hours
                 }
             },
             "page_views": page_views,
             "count": len(page_views)
         }
+        _analytics_cache[cache_key] = payload
+        return payload
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Cloudflare API request error: {str(e)}")
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
+        logger.error("Cloudflare API request error: %s", e)
         raise HTTPException(status_code=502, detail=f"Cloudflare API error: {str(e)}")
     except Exception as e:
-        logger.error(f"Web Analytics error: {str(e)}", exc_info=True)
+        logger.error("Web Analytics error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error: {type(e).__name__}: {str(e)}")
 
 
@@ -579,119 +1407,64 @@ async def get_web_performance(
         Web performance data with Core Web Vitals (LCP, FID, CLS, TTFB) and timing metrics
     """
     try:
-        from datetime import datetime, timedelta
-
         # Calculate time range
-        end_time = datetime.utcnow()
+        end_time = datetime.now(timezone.utc)
         start_time = end_time - timedelta(hours=hours)
+        # The RUM datasets take whole-second timestamps
+        start_iso = start_time.isoformat(timespec="seconds").replace("+00:00", "Z")
+        end_iso = end_time.isoformat(timespec="seconds").replace("+00:00", "Z")
 
-        # Cloudflare GraphQL endpoint
-        graphql_url = "https://api.cloudflare.com/client/v4/graphql"
-        headers = {
-            "Authorization": f"Bearer {CLOUDFLARE_API_TOKEN}",
-            "Content-Type": "application/json"
-        }
-
-        # Build hostname filter for the GraphQL query
-        if host:
-            host_filter = f', requestHost: "{host}"'
-        else:
-            host_filter = ""
-
-        # GraphQL query for Web Performance metrics - combine timing and web vitals
-        query = """
-        query WebPerformance($accountTag: string, $startTime: Time!, $endTime: Time!) {
-            viewer {
-                accounts(filter: { accountTag: $accountTag }) {
-                    performance: rumPerformanceEventsAdaptiveGroups(
-                        filter: {
-                            datetime_geq: $startTime,
-                            datetime_lt: $endTime%s
-                        },
-                        limit: 1000,
-                        orderBy: [datetimeHour_DESC]
-                    ) {
-                        count
-                        dimensions {
-                            datetimeHour
-                            requestHost
-                        }
-                        quantiles {
-                            pageLoadTimeP75
-                            dnsTimeP75
-                            connectionTimeP75
-                            requestTimeP75
-                            responseTimeP75
-                            firstContentfulPaintP75
-                        }
-                    }
-                    webVitals: rumWebVitalsEventsAdaptiveGroups(
-                        filter: {
-                            datetime_geq: $startTime,
-                            datetime_lt: $endTime%s
-                        },
-                        limit: 1000,
-                        orderBy: [datetimeHour_DESC]
-                    ) {
-                        count
-                        dimensions {
-                            datetimeHour
-                            requestHost
-                        }
-                        quantiles {
-                            largestContentfulPaintP75
-                            firstInputDelayP75
-                            cumulativeLayoutShiftP75
-                            timeToFirstByteP75
-                            firstContentfulPaintP75
-                        }
-                    }
-                }
-            }
-        }
-        """ % (host_filter, host_filter)
+        cache_key = ("web-performance", host, hours)
+        cached = _analytics_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
         variables = {
             "accountTag": CLOUDFLARE_ACCOUNT_ID,
-            "startTime": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-            "endTime": end_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+            "startTime": start_iso,
+            "endTime": end_iso
         }
+        if host:
+            query = WEB_PERFORMANCE_HOST_QUERY
+            variables["host"] = host
+        else:
+            query = WEB_PERFORMANCE_QUERY
 
         # Make request to Cloudflare
-        logger.info(f"Querying Cloudflare Web Performance: {start_time} to {end_time}")
-        response = requests.post(
-            graphql_url,
-            headers=headers,
-            json={"query": query, "variables": variables},
-            timeout=30
-        )
+        logger.info("Querying Cloudflare Web Performance: %s to %s", start_time, end_time)
+        response = await cloudflare_graphql(query, variables)
         response.raise_for_status()
 
-        result = response.json()
+        result = orjson.loads(response.content)
 
         # Parse and format response
-        if "errors" in result and result["errors"] is not None:
+        errors = result.get("errors")
+        if errors:
             raise HTTPException(
                 status_code=500,
-                detail=f"Cloudflare API error: {result['errors']}"
+                detail=f"Cloudflare API error: {errors}"
             )
 
-        account_data = result.get("data", {}).get("viewer", {}).get("accounts", [{}])[0]
+        try:
+            account_data = result["data"]["viewer"]["accounts"][0]
+        except (KeyError, IndexError, TypeError):
+            account_data = {}
         perf_groups = account_data.get("performance", [])
         vitals_groups = account_data.get("webVitals", [])
 
         # Merge performance timing and web vitals by timestamp and host
-        combined_data = {}
+        combined_data = defaultdict(dict)
 
         # Process performance timing metrics
         for group in perf_groups:
             dims = group["dimensions"]
-            key = (dims["datetimeHour"], dims.get("requestHost", ""))
+            timestamp = dims["datetimeHour"]
+            row_host = dims.get("requestHost", "")
             quantiles = group.get("quantiles", {})
 
-            combined_data[key] = {
-                "timestamp": dims["datetimeHour"],
-                "host": dims.get("requestHost", ""),
+            combined_data[(timestamp, row_host)].update({
+                "timestamp": timestamp,
+                "host": row_host,
                 "sample_count": group.get("count", 0),
                 "timing_p75": {
                     "page_load_ms": round(quantiles.get("pageLoadTimeP75", 0) / 1000, 2),
@@ -702,12 +1475,13 @@ async def get_web_performance(
                     "fcp_ms": round(quantiles.get("firstContentfulPaintP75", 0) / 1000, 2)
                 },
                 "web_vitals_p75": {}
-            }
+            })
 
         # Add web vitals data
         for group in vitals_groups:
             dims = group["dimensions"]
-            key = (dims["datetimeHour"], dims.get("requestHost", ""))
+            timestamp = dims["datetimeHour"]
+            row_host = dims.get("requestHost", "")
             quantiles = group.get("quantiles", {})
 
             # Convert from microseconds to milliseconds (divide by 1000)
@@ -719,46 +1493,60 @@ async def get_web_performance(
                 "fcp_ms": round(quantiles.get("firstContentfulPaintP75", 0) / 1000, 2)
             }
 
-            if key in combined_data:
-                combined_data[key]["web_vitals_p75"] = vitals
-            else:
-                combined_data[key] = {
-                    "timestamp": dims["datetimeHour"],
-                    "host": dims.get("requestHost", ""),
+            entry = combined_data[(timestamp, row_host)]
+            if not entry:
+                # Hour/host with web vitals but no timing samples
+                entry.update({
+                    "timestamp": timestamp,
+                    "host": row_host,
                     "sample_count": group.get("count", 0),
-                    "timing_p75": {},
-                    "web_vitals_p75": vitals
-                }
+                    "timing_p75": {}
+                })
+            entry["web_vitals_p75"] = vitals
 
         performance_data = list(combined_data.values())
 
-        # Calculate summary stats
-        total_samples = sum(pd["sample_count"] for pd in performance_data)
-        unique_hosts = len(set(pd["host"] for pd in performance_data if pd["host"]))
-
-        # Calculate averages for Core Web Vitals
-        lcp_vals = [pd["web_vitals_p75"].get("lcp_ms", 0) for pd in performance_data if pd.get("web_vitals_p75", {}).get("lcp_ms", 0) > 0]
-        fid_vals = [pd["web_vitals_p75"].get("fid_ms", 0) for pd in performance_data if pd.get("web_vitals_p75", {}).get("fid_ms", 0) > 0]
-        cls_vals = [pd["web_vitals_p75"].get("cls", 0) for pd in performance_data if pd.get("web_vitals_p75", {}).get("cls", 0) > 0]
-        ttfb_vals = [pd["web_vitals_p75"].get("ttfb_ms", 0) for pd in performance_data if pd.get("web_vitals_p75", {}).get("ttfb_ms", 0) > 0]
-        page_load_vals = [pd["timing_p75"].get("page_load_ms", 0) for pd in performance_data if pd.get("timing_p75", {}).get("page_load_ms", 0) > 0]
-
-        return {
+        # Calculate summary stats and Core Web Vitals averages in one pass,
+        # counting only non-zero samples towards each average
+        total_samples = 0
+        hosts = set()
+        vital_sums = dict.fromkeys(("lcp_ms", "fid_ms", "cls", "ttfb_ms"), 0)
+        vital_counts = dict.fromkeys(vital_sums, 0)
+        page_load_sum = page_load_n = 0
+        for pd in performance_data:
+            total_samples += pd["sample_count"]
+            if pd["host"]:
+                hosts.add(pd["host"])
+            for metric, value in pd["web_vitals_p75"].items():
+                if metric in vital_sums and value > 0:
+                    vital_sums[metric] += value
+                    vital_counts[metric] += 1
+            page_load = pd["timing_p75"].get("page_load_ms", 0)
+            if page_load > 0:
+                page_load_sum += page_load
+                page_load_n += 1
+        unique_hosts = len(hosts)
+
+        def vital_avg(metric: str, digits: int = 2):
+            n = vital_counts[metric]
+            return round(vital_sums[metric] / n, digits) if n else 0
+
+        payload = {
             "summary": {
                 "total_samples": total_samples,
                 "unique_hosts": unique_hosts,
                 "avg_web_vitals_p75": {
-                    "lcp_ms": round(sum(lcp_vals) / len(lcp_vals), 2) if lcp_vals else 0,
-                    "fid_ms": round(sum(fid_vals) / len(fid_vals), 2) if fid_vals else 0,
-                    "cls": round(sum(cls_vals) / len(cls_vals), 4) if cls_vals else 0,
-                    "ttfb_ms": round(sum(ttfb_vals) / len(ttfb_vals), 2) if ttfb_vals else 0
+                    "lcp_ms": vital_avg("lcp_ms"),
+                    "fid_ms": vital_avg("fid_ms"),
+                    "cls": vital_avg("cls", 4),
+                    "ttfb_ms": vital_avg("ttfb_ms")
                 },
                 "avg_timing_p75": {
-                    "page_load_ms": round(sum(page_load_vals) / len(page_load_vals), 2) if page_load_vals else 0
+                    "page_load_ms": round(page_load_sum / page_load_n, 2) if page_load_n else 0
                 },
                 "time_range": {
-                    "start": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                    "end": end_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "start": start_iso,
+                    "end": end_iso,
                     "hours": hours
                 },
                 "notes": {
@@ -773,31 +1561,141 @@ async def get_web_performance(
             "performance_data": performance_data,
             "count": len(performance_data)
         }
+        _analytics_cache[cache_key] = payload
+        return payload
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Cloudflare API request error: {str(e)}")
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
+        logger.error("Cloudflare API request error: %s", e)
         raise HTTPException(status_code=502, detail=f"Cloudflare API error: {str(e)}")
     except Exception as e:
-        logger.error(f"Web Performance error: {str(e)}", exc_info=True)
+        logger.error("Web Performance error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error: {type(e).__name__}: {str(e)}")
 
 
+def _merge_field_sets(ours: dict, theirs: dict) -> dict:
+    """Union of two FieldsV1 ownership trees"""
+    merged = dict(ours)
+    for key, value in theirs.items():
+        merged[key] = _merge_field_sets(merged[key], value) if key in merged else value
+    return merged
+
+
+def _owns_legacy_spec_fields(entry: dict) -> bool:
+    return (
+        entry.get("manager") == LEGACY_FIELD_MANAGER
+        and entry.get("operation") == "Update"
+        and not entry.get("subresource")
+        and "f:spec" in (entry.get("fieldsV1") or {})
+    )
+
+
+def adopt_legacy_spec_fields(service: dict) -> Optional[list]:
+    """managedFields with the legacy manager's spec fields moved to our apply entry.
+
+    Fields still owned by the pre-apply manager survive our applies even when
+    omitted, so a removed env var or idle timeout would linger on older Services.
+    Taking over its spec ownership once makes the next apply prune them. Returns
+    None when there is nothing to adopt; the object itself is left untouched.
+    """
+    managed_fields = service["metadata"].get("managedFields") or []
+    if not any(_owns_legacy_spec_fields(entry) for entry in managed_fields):
+        return None
+
+    adopted = {}
+    adopted_time = None
+    kept = []
+    for entry in managed_fields:
+        if not _owns_legacy_spec_fields(entry):
+            kept.append(entry)
+            continue
+        fields = dict(entry["fieldsV1"])
+        adopted = _merge_field_sets(adopted, fields.pop("f:spec"))
+        adopted_time = adopted_time or entry.get("time")
+        # Whatever it owns outside the spec stays with the legacy manager
+        if fields:
+            kept.append({**entry, "fieldsV1": fields})
+
+    for i, entry in enumerate(kept):
+        if entry.get("manager") == FIELD_MANAGER and entry.get("operation") == "Apply":
+            fields = _merge_field_sets(entry.get("fieldsV1") or {}, {"f:spec": adopted})
+            kept[i] = {**entry, "fieldsV1": fields}
+            break
+    else:
+        kept.append({
+            "manager": FIELD_MANAGER,
+            "operation": "Apply",
+            "apiVersion": KNATIVE_API_VERSION,
+            "fieldsType": "FieldsV1",
+            "fieldsV1": {"f:spec": adopted},
+            "time": adopted_time
+        })
+    return kept
+
+
+async def migrate_legacy_field_ownership(service: dict) -> bool:
+    """Hand a pre-apply Service's spec ownership to FIELD_MANAGER, once.
+
+    Returns whether there was legacy ownership and it was moved.
+    """
+    managed_fields = adopt_legacy_spec_fields(service)
+    if managed_fields is None:
+        return False
+
+    metadata = service["metadata"]
+    logger.info("Adopting legacy spec fields of Knative Service %s", metadata["name"])
+    try:
+        # The test op makes this a no-op if the Service changed since it was read
+        await apiserver_write(
+            custom_api.patch_namespaced_custom_object,
+            group=KNATIVE_GROUP,
+            version=KNATIVE_VERSION,
+            namespace=metadata["namespace"],
+            plural=KNATIVE_SERVICE_PLURAL,
+            name=metadata["name"],
+            body=[
+                {"op": "test", "path": "/metadata/resourceVersion", "value": metadata["resourceVersion"]},
+                {"op": "replace", "path": "/metadata/managedFields", "value": managed_fields}
+            ],
+            _content_type=JSON_PATCH_CONTENT_TYPE
+        )
+    except ApiException as e:
+        # Removed fields just linger until a later deploy retries this
+        logger.warning("Could not adopt legacy fields of %s: %s - %s", metadata["name"], e.status, e.reason)
+        return False
+    return True
+
+
+def deployment_response(name: str, namespace: str, action: str, url: str) -> ORJSONResponse:
+    """Successful /deploy response, serialized straight from the model.
+
+    Returning a Response skips FastAPI's dump-and-revalidate pass against
+    response_model, which still documents the schema.
+    """
+    return ORJSONResponse(DeploymentResponse(
+        name=name,
+        namespace=namespace,
+        action=action,
+        status="success",
+        url=url
+    ).model_dump(mode="json"))
+
+
 @app.post("/deploy", response_model=DeploymentResponse)
 async def deploy_app(request: DeploymentRequest):
     """
     Deploy or update an app using Knative Serving.
     If the app doesn't exist, it will be created.
     If it exists, it will be updated (triggering a new revision).
+    Redeploying an unchanged spec is a no-op.
     Automatically creates a DomainMapping for clean URLs.
     """
     try:
         namespace = request.namespace
         name = request.name
 
-        logger.info(f"Processing deployment request for {name} in namespace {namespace}")
-
-        # Check if Knative Service exists
-        existing = get_knative_service(name, namespace)
+        logger.info("Processing deployment request for %s in namespace %s", name, namespace)
 
         # Create the spec
         knative_service = create_knative_service_spec(
@@ -808,124 +1706,162 @@ async def deploy_app(request: DeploymentRequest):
             size=request.size
         )
 
-        if existing is None:
-            # Create new Knative Service
-            logger.info(f"Creating new Knative Service: {name}")
-            result = custom_api.create_namespaced_custom_object(
-                group=KNATIVE_GROUP,
-                version=KNATIVE_VERSION,
-                namespace=namespace,
-                plural=KNATIVE_SERVICE_PLURAL,
-                body=knative_service
-            )
-            action = "created"
-        else:
-            # Update existing Knative Service
-            logger.info(f"Updating existing Knative Service: {name}")
-            result = custom_api.patch_namespaced_custom_object(
-                group=KNATIVE_GROUP,
-                version=KNATIVE_VERSION,
-                namespace=namespace,
-                plural=KNATIVE_SERVICE_PLURAL,
-                name=name,
-                body=knative_service
-            )
-            action = "updated"
-
-        # Construct primary URL (Knative auto-configures subdomain, no DomainMapping needed)
-        subdomain = f"{name}.{DOMAIN}"
-        clean_url = f"https://{subdomain}"
-
-        # If custom domain is provided, create DomainMapping for it
+        # If custom domain is provided, create DomainMapping for it. It only refers to
+        # the Service by name, so its write runs alongside the Service apply below;
+        # the response doesn't depend on it, so don't wait for it either
         if request.custom_domain:
-            logger.info(f"Creating DomainMapping for custom domain: {request.custom_domain}")
-            create_or_update_domain_mapping(request.custom_domain, name, namespace)
-            # Purge cache for custom domain
-            purge_cloudflare_cache(request.custom_domain)
+            logger.info("Creating DomainMapping for custom domain: %s", request.custom_domain)
+            run_in_background(create_or_update_domain_mapping(request.custom_domain, name, namespace))
+
+        # Nothing to do if the live Service was applied from this exact spec: skip the
+        # apply, the cache purges and the warm-up. Compare against a fresh GET, not the
+        # watch cache, which may not have seen a previous deploy's apply yet; a stale
+        # copy would turn a rollback to that earlier spec into a silent noop
+        spec_hash = knative_service["metadata"]["annotations"][SPEC_HASH_ANNOTATION]
+        invalidate_cached_object(KNATIVE_SERVICE_PLURAL, name, namespace)
+        existing = await _get_custom_object_cached(KNATIVE_VERSION, KNATIVE_SERVICE_PLURAL, name, namespace)
+        if existing is not None and existing["metadata"].get("annotations", {}).get(SPEC_HASH_ANNOTATION) == spec_hash:
+            logger.info("Knative Service %s is already up to date", name)
+            return deployment_response(name, namespace, "noop", app_url(name))
+
+        # A Service deployed before server-side apply keeps fields our apply omits
+        # unless we take over their ownership first
+        if existing is not None:
+            await migrate_legacy_field_ownership(existing)
+
+        # Server-side apply creates the Knative Service or updates it in a single request.
+        # A create answers 201, which the generated client doesn't deserialize (it only
+        # maps a 200 to a body), so tell the two apart by status code
+        logger.info("Applying Knative Service: %s", name)
+        _, status_code, _ = await apiserver_write(
+            custom_api.patch_namespaced_custom_object_with_http_info,
+            group=KNATIVE_GROUP,
+            version=KNATIVE_VERSION,
+            namespace=namespace,
+            plural=KNATIVE_SERVICE_PLURAL,
+            name=name,
+            body=knative_service,
+            field_manager=FIELD_MANAGER,
+            force=True,
+            _content_type=APPLY_PATCH_CONTENT_TYPE
+        )
+        action = "created" if status_code == 201 else "updated"
 
-        # Purge Cloudflare cache for subdomain
-        purge_cloudflare_cache(subdomain)
+        invalidate_cached_object(KNATIVE_SERVICE_PLURAL, name, namespace)
+        _apps_response_cache.pop((namespace, None), None)
 
-        # Wait for cache purge to propagate to Cloudflare edge locations
-        # This prevents the warm-up request from re-caching stale content
-        logger.info("Waiting 3 seconds for cache purge to propagate...")
-        time.sleep(3)
+        # Construct primary URL (Knative auto-configures subdomain, no DomainMapping needed)
+        subdomain = app_hostname(name)
+        clean_url = app_url(name)
 
-        # Warm up the service to trigger pod creation and image pull (using primary URL)
-        warm_up_service(clean_url)
+        # Cache purge and warm-up take seconds and don't affect the response,
+        # so they run after it has been sent
+        run_in_background(run_post_deploy(subdomain, clean_url, request.custom_domain))
 
-        return DeploymentResponse(
-            name=name,
-            namespace=namespace,
-            action=action,
-            status="success",
-            url=clean_url
-        )
+        return deployment_response(name, namespace, action, clean_url)
 
     except ApiException as e:
-        logger.error(f"Kubernetes API error: {e.status} - {e.reason}")
-        logger.error(f"Error body: {e.body}")
+        logger.error("Kubernetes API error: %s - %s", e.status, e.reason)
+        logger.error("Error body: %s", e.body)
         raise HTTPException(status_code=e.status, detail=str(e.reason))
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/apps")
-async def list_apps(namespace: str = DEFAULT_NAMESPACE):
-    """List all Knative Services (apps) in a namespace"""
+def is_ready(status: Optional[dict]) -> bool:
+    """Whether a Knative Service status reports Ready=True"""
+    if not status:
+        return False
+    for condition in status.get("conditions", ()):
+        if condition.get("type") == "Ready":
+            return condition.get("status") == "True"
+    return False
+
+
+def container_image(item: dict) -> str:
+    """Image of a Knative Service's first container"""
     try:
-        result = custom_api.list_namespaced_custom_object(
-            group=KNATIVE_GROUP,
-            version=KNATIVE_VERSION,
-            namespace=namespace,
-            plural=KNATIVE_SERVICE_PLURAL
-        )
+        return item["spec"]["template"]["spec"]["containers"][0]["image"]
+    except (KeyError, IndexError):
+        return "unknown"
 
-        apps = []
-        for item in result.get("items", []):
-            name = item["metadata"]["name"]
 
-            # Skip infrastructure services
-            if name in ["kserve-api", "scheduler-api"]:
-                continue
+def summarize_app(item: dict) -> dict:
+    """/apps entry for a Knative Service"""
+    metadata = item["metadata"]
+    name = metadata["name"]
+
+    return {
+        "name": name,
+        "namespace": metadata["namespace"],
+        "url": app_url(name),
+        "ready": is_ready(item.get("status")),
+        "image": container_image(item)
+    }
 
-            # Check if service is ready
-            conditions = item.get("status", {}).get("conditions", [])
-            ready = any(c.get("type") == "Ready" and c.get("status") == "True" for c in conditions)
 
-            apps.append({
-                "name": name,
-                "namespace": item["metadata"]["namespace"],
-                "url": f"https://{name}.{DOMAIN}",
-                "ready": ready,
-                "image": item.get("spec", {}).get("template", {}).get("spec", {}).get("containers", [{}])[0].get("image", "unknown")
-            })
+@app.get("/apps")
+async def list_apps(request: Request, namespace: str = DEFAULT_NAMESPACE, nocache: bool = False):
+    """List all Knative Services (apps) in a namespace"""
+    try:
+        cache_key = (namespace, knative_service_cache.resource_version if knative_service_cache.synced else None)
+        cached = None if nocache else _apps_response_cache.get(cache_key)
+        if cached is not None:
+            etag, body = cached
+            if etag_matches(request, etag):
+                return Response(status_code=304, headers={"ETag": etag})
+            return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+        if knative_service_cache.synced:
+            items = knative_service_cache.list(namespace)
+            resource_version = knative_service_cache.resource_version
+        else:
+            result = await list_knative_services(namespace)
+            items = result.get("items", [])
+            resource_version = result["metadata"]["resourceVersion"]
+
+        # Pollers that already hold this state get a 304 instead of the list
+        etag = weak_etag(resource_version)
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
 
-        return {"apps": apps, "count": len(apps)}
+        # Skip infrastructure services
+        apps = [summarize_app(item) for item in items if item["metadata"]["name"] not in INFRA_SERVICES]
+
+        body = orjson.dumps({"apps": apps, "count": len(apps)})
+        _apps_response_cache[cache_key] = (etag, body)
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
     except ApiException as e:
         raise HTTPException(status_code=e.status, detail=str(e.reason))
 
 
 @app.get("/apps/{namespace}/{name}")
-async def get_app(namespace: str, name: str):
+async def get_app(request: Request, response: Response, namespace: str, name: str):
     """Get details of a specific Knative Service (app)"""
     try:
-        result = get_knative_service(name, namespace)
+        result = await get_knative_service(name, namespace)
 
         if result is None:
             raise HTTPException(status_code=404, detail=f"App {name} not found in namespace {namespace}")
 
-        containers = result.get("spec", {}).get("template", {}).get("spec", {}).get("containers", [])
-        image = containers[0].get("image", "unknown") if containers else "unknown"
+        etag = weak_etag(result["metadata"]["resourceVersion"])
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+        try:
+            conditions = result["status"]["conditions"]
+        except KeyError:
+            conditions = []
 
         return {
             "name": result["metadata"]["name"],
             "namespace": result["metadata"]["namespace"],
-            "image": image,
-            "url": f"https://{name}.{DOMAIN}",
-            "conditions": result.get("status", {}).get("conditions", [])
+            "image": container_image(result),
+            "url": app_url(name),
+            "conditions": conditions
         }
 
     except ApiException as e:
@@ -936,22 +1872,20 @@ async def get_app(namespace: str, name: str):
 async def delete_app(namespace: str, name: str):
     """Delete a Knative Service (app) and its DomainMapping"""
     try:
-        existing = get_knative_service(name, namespace)
-
-        if existing is None:
-            raise HTTPException(status_code=404, detail=f"App {name} not found in namespace {namespace}")
-
         # Note: Custom domain mappings need to be deleted manually if they exist
         # Subdomain is auto-managed by Knative, no DomainMapping to delete
 
-        # Delete Knative Service
-        custom_api.delete_namespaced_custom_object(
+        # Delete Knative Service; a missing app comes back as a 404 from the apiserver
+        await apiserver_write(
+            custom_api.delete_namespaced_custom_object,
             group=KNATIVE_GROUP,
             version=KNATIVE_VERSION,
             namespace=namespace,
             plural=KNATIVE_SERVICE_PLURAL,
             name=name
         )
+        invalidate_cached_object(KNATIVE_SERVICE_PLURAL, name, namespace)
+        _apps_response_cache.pop((namespace, None), None)
 
         return {
             "name": name,
@@ -960,6 +1894,9 @@ async def delete_app(namespace: str, name: str):
         }
 
     except ApiException as e:
+        if e.status == 404:
+            invalidate_cached_object(KNATIVE_SERVICE_PLURAL, name, namespace)
+            raise HTTPException(status_code=404, detail=f"App {name} not found in namespace {namespace}")
         raise HTTPException(status_code=e.status, detail=str(e.reason))
 
 
@@ -970,21 +1907,13 @@ async def get_logs(name: str, namespace: str = DEFAULT_NAMESPACE, tail_lines: in
     Returns the latest 100 lines (or specified tail_lines) from the app pod.
     """
     try:
-        # Check if Knative Service exists
-        existing = get_knative_service(name, namespace)
-        if existing is None:
-            raise HTTPException(status_code=404, detail=f"App {name} not found in namespace {namespace}")
-
-        # Find pods for this Knative Service
-        # Knative creates pods with labels: serving.knative.dev/service={name}
-        label_selector = f"serving.knative.dev/service={name}"
-
-        pods = core_v1.list_namespaced_pod(
-            namespace=namespace,
-            label_selector=label_selector
-        )
+        # Find the most recent pod for this Knative Service. A pod carrying the
+        # service label implies the app exists, so only check when there is none
+        latest_pod = await get_latest_pod(name, namespace)
 
-        if not pods.items:
+        if latest_pod is None:
+            if await get_knative_service(name, namespace) is None:
+                raise HTTPException(status_code=404, detail=f"App {name} not found in namespace {namespace}")
             return {
                 "name": name,
                 "namespace": namespace,
@@ -992,50 +1921,41 @@ async def get_logs(name: str, namespace: str = DEFAULT_NAMESPACE, tail_lines: in
                 "message": "No pods found for this app. The app may not be running yet or scaled to zero."
             }
 
-        # Get the most recent pod (by creation time)
-        latest_pod = max(pods.items, key=lambda p: p.metadata.creation_timestamp)
         pod_name = latest_pod.metadata.name
+        pod_phase = latest_pod.status.phase
 
-        # Check if pod is ready
-        if latest_pod.status.phase not in ["Running", "Succeeded"]:
-            try:
-                logs = core_v1.read_namespaced_pod_log(
-                    name=pod_name,
-                    namespace=namespace,
-                    container="user-container",
-                    tail_lines=tail_lines
-                )
-            except ApiException:
-                return {
-                    "name": name,
-                    "namespace": namespace,
-                    "pod_name": pod_name,
-                    "pod_status": latest_pod.status.phase,
-                    "logs": "",
-                    "message": f"Pod is in {latest_pod.status.phase} state and logs are not available yet."
-                }
-        else:
-            # Get logs from the user container
-            logs = core_v1.read_namespaced_pod_log(
-                name=pod_name,
-                namespace=namespace,
-                container="user-container",
-                tail_lines=tail_lines
-            )
+        # Get logs from the user container
+        try:
+            resp = await open_pod_log(pod_name, namespace, tail_lines=tail_lines)
+        except ApiException:
+            # A pod that isn't ready yet may have no logs to read
+            if pod_phase in LOG_READY_PHASES:
+                raise
+            return {
+                "name": name,
+                "namespace": namespace,
+                "pod_name": pod_name,
+                "pod_status": pod_phase,
+                "logs": "",
+                "message": f"Pod is in {pod_phase} state and logs are not available yet."
+            }
 
-        return {
+        # Relay the log body as it arrives instead of buffering it into one string
+        envelope = {
             "name": name,
             "namespace": namespace,
             "pod_name": pod_name,
-            "pod_status": latest_pod.status.phase,
-            "tail_lines": tail_lines,
-            "logs": logs
+            "pod_status": pod_phase,
+            "tail_lines": tail_lines
         }
+        return StreamingResponse(stream_logs_json(envelope, resp), media_type="application/json")
 
+    except HTTPException:
+        raise
     except ApiException as e:
         raise HTTPException(status_code=e.status, detail=str(e.reason))
     except Exception as e:
-        logger.error(f"Unexpected error fetching logs: {str(e)}")
+        logger.error("Unexpected error fetching logs: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -1045,37 +1965,38 @@ async def stream_logs(name: str, namespace: str = DEFAULT_NAMESPACE, tail_lines:
     Stream logs from an app in real-time via Server-Sent Events.
     """
     # Check if Knative Service exists
-    existing = get_knative_service(name, namespace)
+    existing = await get_knative_service(name, namespace)
     if existing is None:
         raise HTTPException(status_code=404, detail=f"App {name} not found in namespace {namespace}")
 
-    # Find pods for this Knative Service
-    label_selector = f"serving.knative.dev/service={name}"
-    pods = core_v1.list_namespaced_pod(
-        namespace=namespace,
-        label_selector=label_selector
-    )
+    # Find the most recent pod for this Knative Service
+    latest_pod = await get_latest_pod(name, namespace)
 
-    if not pods.items:
+    if latest_pod is None:
         raise HTTPException(status_code=404, detail=f"No pods found for {name}. App may be scaled to zero.")
 
-    latest_pod = max(pods.items, key=lambda p: p.metadata.creation_timestamp)
     pod_name = latest_pod.metadata.name
 
-    def log_generator():
+    async def log_generator():
         try:
-            stream = core_v1.read_namespaced_pod_log(
-                name=pod_name,
-                namespace=namespace,
-                container="user-container",
-                follow=True,
-                tail_lines=tail_lines,
-                _preload_content=False
-            )
-            for line in stream:
-                if isinstance(line, bytes):
-                    line = line.decode("utf-8")
-                yield f"data: {line}\n\n"
+            stream = await open_pod_log(pod_name, namespace, follow=True, tail_lines=tail_lines)
+            # Wait for the next line without cancelling the read, so a heartbeat
+            # can be sent while the app is quiet without dropping partial lines
+            next_line = asyncio.ensure_future(stream.content.readline())
+            try:
+                while True:
+                    done, _ = await asyncio.wait({next_line}, timeout=LOG_HEARTBEAT_SECONDS)
+                    if not done:
+                        yield ": heartbeat\n\n"
+                        continue
+                    line = next_line.result()
+                    if not line:
+                        break
+                    yield f"data: {line.decode('utf-8')}\n\n"
+                    next_line = asyncio.ensure_future(stream.content.readline())
+            finally:
+                next_line.cancel()
+                stream.release()
         except Exception as e:
             yield f"data: [error] {str(e)}\n\n"
 
@@ -1092,4 +2013,15 @@ async def stream_logs(name: str, namespace: str = DEFAULT_NAMESPACE, tail_lines:
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    # Each worker is a separate process with its own caches and watch stream.
+    # The k8s manifests cap the container at 0.5 CPU, so the default is a single worker;
+    # raise WEB_CONCURRENCY on larger CPU limits.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8080,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="uvloop",
+        http="httptools",
+        log_level="info"
+    )
@@ -0,0 +1,54 @@
+"""
+Tests for the retrying Cloudflare GraphQL client.
+
+Run from kserve-api/: python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main  # noqa: E402
+
+
+class CloudflareGraphqlTest(unittest.IsolatedAsyncioTestCase):
+    async def query(self, statuses: list) -> tuple:
+        answers = iter(statuses)
+        sent = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            sent.append(request.content)
+            return httpx.Response(next(answers), headers={"Retry-After": "0"}, json={"data": {}})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=main.CLOUDFLARE_API_BASE)
+        with mock.patch.object(main, "cloudflare_client", client):
+            response = await main.cloudflare_graphql("{ viewer { zones } }", {"zoneTag": "zone"})
+        await client.aclose()
+        return response, sent
+
+    async def test_throttled_and_gateway_errors_are_retried(self):
+        response, sent = await self.query([429, 502, 200])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(sent), 3)
+        self.assertEqual(len(set(sent)), 1)
+
+    async def test_gives_up_after_retries(self):
+        response, sent = await self.query([503] * (main.CLOUDFLARE_RETRIES + 1))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(sent), main.CLOUDFLARE_RETRIES + 1)
+
+    async def test_client_errors_are_not_retried(self):
+        response, sent = await self.query([400])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(sent), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
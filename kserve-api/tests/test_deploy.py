@@ -0,0 +1,199 @@
+"""
+Tests for POST /deploy against a fake apiserver.
+
+Run from kserve-api/: python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+import orjson
+from aiohttp import web
+from kubernetes_asyncio import client
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main  # noqa: E402
+
+SERVICE_PATH = "/apis/serving.knative.dev/v1/namespaces/default/services/{name}"
+
+
+class FakeApiserver:
+    """Serves Knative Service GETs and server-side applies the way the apiserver does"""
+
+    def __init__(self):
+        self.services = {}
+        self.requests = []
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(SERVICE_PATH, self.get)
+        app.router.add_patch(SERVICE_PATH, self.apply)
+        return app
+
+    async def get(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        self.requests.append(("GET", name))
+        if name not in self.services:
+            return web.json_response({"kind": "Status", "code": 404, "reason": "NotFound"}, status=404)
+        return web.json_response(self.services[name])
+
+    async def apply(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        self.requests.append(("PATCH", name, request.content_type, request.query.get("fieldManager")))
+        body = orjson.loads(await request.read())
+        if request.content_type == main.JSON_PATCH_CONTENT_TYPE:
+            return self.json_patch(name, body)
+        created = name not in self.services
+        generation = 1 if created else self.services[name]["metadata"]["generation"] + 1
+        body["metadata"].update({"namespace": "default", "generation": generation, "resourceVersion": str(len(self.requests))})
+        if not created and "managedFields" in self.services[name]["metadata"]:
+            body["metadata"]["managedFields"] = self.services[name]["metadata"]["managedFields"]
+        self.services[name] = body
+        # A create through apply answers 201 Created, an update 200 OK
+        return web.json_response(body, status=201 if created else 200)
+
+    def json_patch(self, name: str, operations: list) -> web.Response:
+        """Just the test + replace /metadata/managedFields patch used for ownership migration"""
+        service = self.services[name]
+        for operation in operations:
+            field = operation["path"].rsplit("/", 1)[1]
+            if operation["op"] == "test" and service["metadata"][field] != operation["value"]:
+                return web.json_response({"kind": "Status", "code": 422, "reason": "Invalid"}, status=422)
+            if operation["op"] == "replace":
+                service["metadata"][field] = operation["value"]
+        return web.json_response(service)
+
+
+class DeployTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.apiserver = FakeApiserver()
+        self.runner = web.AppRunner(self.apiserver.app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        configuration = client.Configuration(host=f"http://127.0.0.1:{port}")
+        self.api_client = client.ApiClient(configuration=configuration)
+        self._saved = (main.custom_api, main.run_in_background)
+        main.custom_api = client.CustomObjectsApi(self.api_client)
+        main._existence_cache.clear()
+
+        # Capture the post-deploy purge and warm-up instead of running them
+        self.post_deploy = []
+
+        def run_in_background(coro):
+            self.post_deploy.append(coro.__name__)
+            coro.close()
+
+        main.run_in_background = run_in_background
+
+    async def asyncTearDown(self):
+        main.custom_api, main.run_in_background = self._saved
+        await self.api_client.close()
+        await self.runner.cleanup()
+
+    async def deploy(self, **fields) -> dict:
+        request = main.DeploymentRequest(**{"name": "demo", "image": "registry/demo:1", **fields})
+        response = await main.deploy_app(request)
+        self.assertEqual(response.status_code, 200)
+        return orjson.loads(response.body)
+
+    async def test_first_deploy_applies_and_reports_created(self):
+        result = await self.deploy()
+
+        self.assertEqual(result["action"], "created")
+        self.assertEqual(result["url"], f"https://demo.{main.DOMAIN}")
+        self.assertIn(("PATCH", "demo", main.APPLY_PATCH_CONTENT_TYPE, main.FIELD_MANAGER), self.apiserver.requests)
+        self.assertIn("demo", self.apiserver.services)
+        self.assertEqual(self.post_deploy, ["run_post_deploy"])
+
+    async def test_changed_redeploy_reports_updated(self):
+        await self.deploy()
+        result = await self.deploy(image="registry/demo:2")
+
+        self.assertEqual(result["action"], "updated")
+        self.assertEqual(self.post_deploy, ["run_post_deploy", "run_post_deploy"])
+
+    async def test_identical_redeploy_is_noop(self):
+        await self.deploy()
+        result = await self.deploy()
+
+        self.assertEqual(result["action"], "noop")
+        self.assertEqual(self.post_deploy, ["run_post_deploy"])
+
+    async def test_rollback_is_applied_while_watch_cache_lags(self):
+        await self.deploy()
+        stale = self.apiserver.services["demo"]
+        await self.deploy(image="registry/demo:2")
+
+        # The watch cache still holds the first spec; the live Service runs the second
+        saved = (main.knative_service_cache.synced, main.knative_service_cache.services)
+        main.knative_service_cache.synced = True
+        main.knative_service_cache.services = {"default": {"demo": stale}}
+        try:
+            result = await self.deploy()
+        finally:
+            main.knative_service_cache.synced, main.knative_service_cache.services = saved
+
+        self.assertEqual(result["action"], "updated")
+        self.assertEqual(self.apiserver.services["demo"]["spec"]["template"]["spec"]["containers"][0]["image"], "registry/demo:1")
+
+    async def test_legacy_spec_ownership_is_adopted_before_apply(self):
+        self.apiserver.services["demo"] = {
+            "apiVersion": main.KNATIVE_API_VERSION,
+            "kind": "Service",
+            "metadata": {
+                "name": "demo",
+                "namespace": "default",
+                "generation": 3,
+                "resourceVersion": "41",
+                "managedFields": [{
+                    "manager": main.LEGACY_FIELD_MANAGER,
+                    "operation": "Update",
+                    "apiVersion": main.KNATIVE_API_VERSION,
+                    "fieldsType": "FieldsV1",
+                    "fieldsV1": {
+                        "f:metadata": {"f:labels": {}},
+                        "f:spec": {"f:template": {"f:spec": {"f:containers": {}}}}
+                    }
+                }]
+            },
+            "spec": {}
+        }
+
+        result = await self.deploy()
+
+        self.assertEqual(result["action"], "updated")
+        methods = [(entry[0], entry[2] if len(entry) > 2 else None) for entry in self.apiserver.requests]
+        self.assertEqual(methods, [
+            ("GET", None),
+            ("PATCH", main.JSON_PATCH_CONTENT_TYPE),
+            ("PATCH", main.APPLY_PATCH_CONTENT_TYPE)
+        ])
+
+    def test_adopt_legacy_spec_fields(self):
+        legacy = {
+            "manager": main.LEGACY_FIELD_MANAGER,
+            "operation": "Update",
+            "fieldsV1": {"f:metadata": {"f:labels": {}}, "f:spec": {"f:template": {"f:spec": {}}}}
+        }
+        ours = {"manager": main.FIELD_MANAGER, "operation": "Apply", "fieldsV1": {"f:spec": {"f:template": {"f:metadata": {}}}}}
+        status = {"manager": "controller", "operation": "Update", "subresource": "status", "fieldsV1": {"f:status": {}}}
+        service = {"metadata": {"managedFields": [legacy, ours, status]}}
+
+        managed_fields = main.adopt_legacy_spec_fields(service)
+
+        self.assertEqual(managed_fields, [
+            {**legacy, "fieldsV1": {"f:metadata": {"f:labels": {}}}},
+            {**ours, "fieldsV1": {"f:spec": {"f:template": {"f:metadata": {}, "f:spec": {}}}}},
+            status
+        ])
+        # The (possibly watch-cached) object itself is not modified
+        self.assertIn("f:spec", legacy["fieldsV1"])
+        self.assertIsNone(main.adopt_legacy_spec_fields({"metadata": {"managedFields": [ours, status]}}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Tests for CloudflarePurgeBatcher and background-task shutdown.
+
+Run from kserve-api/: python -m unittest discover tests
+"""
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main  # noqa: E402
+
+
+class PurgeBatcherTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_purges_share_one_call(self):
+        sent = []
+
+        async def purge(domains):
+            sent.append(domains)
+
+        batcher = main.CloudflarePurgeBatcher(max_hosts=3, window=0.05)
+        with mock.patch.object(main, "purge_cloudflare_cache", purge):
+            runner = asyncio.create_task(batcher.run())
+            await asyncio.gather(*(batcher.purge([f"app{i}.example.com", "shared.example.com"]) for i in range(3)))
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+
+        self.assertEqual(sent, [
+            ["app0.example.com", "shared.example.com", "app1.example.com"],
+            ["app2.example.com", "shared.example.com"]
+        ])
+
+    async def test_stopping_releases_waiting_callers(self):
+        async def purge(domains):
+            await asyncio.sleep(10)
+
+        batcher = main.CloudflarePurgeBatcher(max_hosts=1, window=0.01)
+        with mock.patch.object(main, "purge_cloudflare_cache", purge):
+            runner = asyncio.create_task(batcher.run())
+            callers = [asyncio.create_task(batcher.purge([f"app{i}.example.com"])) for i in range(3)]
+            await asyncio.sleep(0.05)
+            runner.cancel()
+            results = await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), 1)
+
+        self.assertTrue(all(isinstance(result, asyncio.CancelledError) for result in results))
+        self.assertTrue(batcher.stopped)
+        # Purges queued after the batcher stopped return instead of hanging
+        await asyncio.wait_for(batcher.purge(["late.example.com"]), 1)
+
+    async def test_drain_waits_then_cancels_background_tasks(self):
+        quick = main.run_in_background(asyncio.sleep(0.01, result="done"))
+        slow = main.run_in_background(asyncio.sleep(10))
+
+        await main.drain_background_tasks(0.1)
+
+        self.assertEqual(quick.result(), "done")
+        self.assertTrue(slow.cancelled())
+        self.assertFalse(main._background_tasks)
+
+
+if __name__ == "__main__":
+    unittest.main()
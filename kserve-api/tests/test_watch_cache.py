@@ -0,0 +1,103 @@
+"""
+Tests for the LIST + WATCH Knative Service cache against a fake apiserver.
+
+Run from kserve-api/: python -m unittest discover tests
+"""
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+import aiohttp
+import orjson
+from aiohttp import web
+from kubernetes_asyncio import client
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main  # noqa: E402
+
+SERVICES_PATH = "/apis/serving.knative.dev/v1/services"
+
+
+def service(name: str, resource_version: str) -> dict:
+    return {"metadata": {"name": name, "namespace": "default", "resourceVersion": resource_version}}
+
+
+class FakeWatchApiserver:
+    """Answers LISTs, and watches by replaying scripted responses in order"""
+
+    def __init__(self, watches: list):
+        self.watches = watches
+        self.lists = 0
+        self.watch_versions = []
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(SERVICES_PATH, self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        if request.query.get("watch", "").lower() != "true":
+            self.lists += 1
+            return web.json_response({"metadata": {"resourceVersion": "1"}, "items": [service("demo", "1")]})
+
+        self.watch_versions.append(request.query.get("resourceVersion"))
+        response = web.StreamResponse()
+        await response.prepare(request)
+        script = self.watches.pop(0) if self.watches else "hang"
+        if script == "hang":
+            # A connection that stops sending without being closed
+            await asyncio.sleep(1)
+        else:
+            for event in script:
+                await response.write(orjson.dumps(event) + b"\n")
+        return response
+
+
+class WatchCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def watch(self, watches: list, until) -> tuple:
+        apiserver = FakeWatchApiserver(watches)
+        runner = web.AppRunner(apiserver.app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        api_client = client.ApiClient(configuration=client.Configuration(host=f"http://127.0.0.1:{port}"))
+        cache = main.KnativeServiceWatchCache()
+        with mock.patch.object(main, "custom_api", client.CustomObjectsApi(api_client)), \
+                mock.patch.object(main, "WATCH_REQUEST_TIMEOUT", aiohttp.ClientTimeout(total=None, sock_read=0.2)):
+            task = asyncio.create_task(cache.run())
+            try:
+                for _ in range(100):
+                    await asyncio.sleep(0.02)
+                    if until(apiserver):
+                        break
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await api_client.close()
+                await runner.cleanup()
+        return apiserver, cache
+
+    async def test_watch_expiry_resumes_without_relisting(self):
+        added = {"type": "ADDED", "object": service("other", "2")}
+        apiserver, cache = await self.watch([[added], []], until=lambda apiserver: len(apiserver.watch_versions) >= 3)
+
+        self.assertEqual(apiserver.lists, 1)
+        self.assertEqual(apiserver.watch_versions[:3], ["1", "2", "2"])
+        self.assertTrue(cache.synced)
+        self.assertIn("other", cache.services["default"])
+
+    async def test_silent_connection_reconnects_without_relisting(self):
+        apiserver, cache = await self.watch(["hang"], until=lambda apiserver: len(apiserver.watch_versions) >= 2)
+
+        self.assertEqual(apiserver.lists, 1)
+        self.assertEqual(apiserver.watch_versions[:2], ["1", "1"])
+        self.assertTrue(cache.synced)
+
+
+if __name__ == "__main__":
+    unittest.main()